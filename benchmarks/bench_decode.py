@@ -0,0 +1,79 @@
+"""
+对比作业答案响应的解码耗时与峰值内存：
+- stdlib: 当前路径，json.loads 得到通用字典
+- fast: payloads.loads（orjson / msgspec / json）得到通用字典
+
+需要安装 orjson 或 msgspec（见 requirements-optional.txt），否则两条路径都是标准库 json，对比没有意义。
+
+用法:
+    python benchmarks/bench_decode.py --questions 400 --content-bytes 2000
+    python benchmarks/bench_decode.py --file debug_api_records/answer.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.GetAnswer.payloads import JSON_BACKEND, loads  # noqa: E402
+
+
+def build_payload(args):
+    if args.file:
+        with open(args.file, "rb") as file:
+            return file.read()
+    from src.GetAnswer.stub_server import StubConfig, StubState
+
+    state = StubState(StubConfig(questions=args.questions, parents=args.parents, content_bytes=args.content_bytes))
+    return json.dumps({"code": 200, "msg": "success", "data": state.answers("T-bench")},
+                      ensure_ascii=False).encode("utf-8")
+
+
+def measure(func, raw, rounds):
+    func(raw)  # 预热
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(raw)
+    elapsed = (time.perf_counter() - started) / rounds
+
+    tracemalloc.start()
+    result = func(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="答案响应解码基准测试")
+    parser.add_argument("--file", help="使用已保存的答案接口响应 JSON 文件")
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--parents", type=int, default=30)
+    parser.add_argument("--content-bytes", type=int, default=1500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    if JSON_BACKEND == "json":
+        parser.exit(2, "未安装 orjson 或 msgspec，payloads.loads 回退到了标准库 json，无法对比。\n"
+                       "请先执行: pip install -r requirements-optional.txt\n")
+
+    raw = build_payload(args)
+    print(f"响应大小: {len(raw) / 1024:.1f} KiB, JSON 后端: {JSON_BACKEND}")
+    cases = [
+        ("stdlib", lambda data: json.loads(data)),
+        ("fast", loads),
+    ]
+    baseline = None
+    for name, func in cases:
+        elapsed, peak = measure(func, raw, args.rounds)
+        baseline = baseline or elapsed
+        print(f"{name:<8} {elapsed * 1000:8.2f} ms/次  峰值内存 {peak / 1024:8.1f} KiB  相对耗时 {elapsed / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+请求签名吞吐量基准测试：对比 XinjiaoyuEncryptioner.get_dynamic_encrypt 与 RequestSigner。
+
+用法:
+    python benchmarks/bench_signer.py --seconds 2 --threads 1 4 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.GetAnswer.XinjiaoyuEncryptioner import RequestSigner, XinjiaoyuEncryptioner  # noqa: E402
+
+CLIENT_SESSION_ID = XinjiaoyuEncryptioner.generate_client_session_id()
+SAFE_CODE = XinjiaoyuEncryptioner.encrypt("jbyxinjiaoyu", XinjiaoyuEncryptioner.ENCRYPTION_KEY)
+
+
+def legacy_sign():
+    timestamp = int(time.time() * 1000)
+    return XinjiaoyuEncryptioner.get_dynamic_encrypt(SAFE_CODE, timestamp, CLIENT_SESSION_ID, "applet")
+
+
+def run(sign, seconds, threads):
+    counts = [0] * threads
+    stop = threading.Event()
+
+    def worker(index):
+        count = 0
+        while not stop.is_set():
+            sign()
+            count += 1
+        counts[index] = count
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="请求签名吞吐量基准测试")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    signer = RequestSigner(SAFE_CODE, CLIENT_SESSION_ID, "applet")
+    timestamp = int(time.time() * 1000)
+    assert signer.sign(timestamp)["encrypt"] == XinjiaoyuEncryptioner.get_dynamic_encrypt(
+        SAFE_CODE, timestamp, CLIENT_SESSION_ID, "applet"), "签名结果与 get_dynamic_encrypt 不一致"
+
+    for threads in args.threads:
+        legacy = run(legacy_sign, args.seconds, threads)
+        fast = run(signer.sign, args.seconds, threads)
+        print(f"线程数 {threads:>2}: get_dynamic_encrypt {legacy:>10,.0f} 次/秒 | "
+              f"RequestSigner {fast:>10,.0f} 次/秒 | 提升 {fast / legacy:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
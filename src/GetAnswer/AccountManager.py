@@ -1,5 +1,4 @@
-import json
-import os
+import threading
 import time
 import uuid
 from datetime import timedelta
@@ -9,93 +8,95 @@ import jwt
 import requests
 from loguru import logger
 
-from src.GetAnswer.XinjiaoyuEncryptioner import XinjiaoyuEncryptioner
+from src.GetAnswer import http_session
+from src.GetAnswer.XinjiaoyuEncryptioner import RequestSigner, XinjiaoyuEncryptioner
 from src.GetAnswer.api_client import get_content, save_debug_http_record
-from src.GetAnswer.config import BASE_URL
+from src.GetAnswer.config import ACCOUNT_VALIDITY_TTL, BASE_URL, RELOGIN_COOLDOWN
+from src.GetAnswer.credential_store import get_credential_store
+from src.GetAnswer.metrics import RELOGINS
+from src.GetAnswer.retry import RetryPolicy
+from src.GetAnswer.singleflight import SingleFlight
+
+# 按用户数据文件合并并发的重新登录，同一账号同一时刻只有一次登录在进行
+relogin_group = SingleFlight("relogin")
 
 
 class AccountManager:
     AUTH_URL = f"{BASE_URL}/api/v3/server_system/auth/login"
     DATA_FILE = "user_data.json"  # 保存用户数据的文件
     MAX_RETRIES = 3  # 最大重试次数
+    RETRY_POLICY = RetryPolicy(max_attempts=MAX_RETRIES)
     ENCRYPTION_KEY = "6f0c5ba452b24fa28989e9524d77407a"
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36 MicroMessenger/7.0.20.1781(0x6700143B) NetType/WIFI MiniProgramEnv/Windows WindowsWechat/WMPF WindowsWechat(0x63090a13) UnifiedPCWindowsWechat(0xf2540621) XWEB/16203"
 
-    def __init__(self):
+    def __init__(self, data_file: Optional[str] = None):
+        if data_file:
+            self.DATA_FILE = data_file  # 多账号时每个账号使用独立的数据文件
         self.user_data = {}
         self.public_user_data = {}
         self.HEADERS = {}
         self.studentId = {}
         self.safe_code = None
         self.client_session_id = None
+        self._signer = None
+        self._pending_session = None
+        self._signer_lock = threading.Lock()
+        self._last_relogin = None  # (完成时间, 结果)
+        self._validity = None  # (Token, 是否有效, 检查时间)
+        self._validity_lock = threading.Lock()
+        self.store = get_credential_store(self.DATA_FILE)
         self.load_user_data()
 
+    @property
+    def account_id(self) -> str:
+        """稳定的账号标识（用户数据文件），用于按账号限流，不随 Token 刷新变化"""
+        return self.DATA_FILE
+
     def save_user_data(self, data: dict) -> None:
-        """保存用户数据到文件"""
+        """保存用户数据（写入内存存储，由存储异步原子写盘；已保存的用户名和密码不受影响）"""
         try:
-            # 如果已有用户名和密码，确保它们被保留
-            if os.path.exists(self.DATA_FILE):
-                try:
-                    with open(self.DATA_FILE, "r", encoding="utf-8") as file:
-                        existing_data = json.load(file)
-                        if "username" in existing_data and "password" in existing_data:
-                            data["username"] = existing_data["username"]
-                            data["password"] = existing_data["password"]
-                except Exception:
-                    pass  # 如果读取失败，继续使用新数据
-                    
-            with open(self.DATA_FILE, "w", encoding="utf-8") as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
+            self.store.update(data)
             logger.info("用户数据保存成功")
         except Exception as e:
             logger.error(f"保存用户数据失败: {e}")
-            
+
     def _save_credentials(self, username: str, password: str) -> None:
-        """保存用户名和密码到用户数据文件"""
+        """保存用户名和密码到用户数据存储"""
         try:
-            data = {}
-            if os.path.exists(self.DATA_FILE):
-                try:
-                    with open(self.DATA_FILE, "r", encoding="utf-8") as file:
-                        data = json.load(file)
-                except Exception:
-                    pass  # 如果读取失败，使用空字典
-            
-            # 更新用户名和密码
-            data["username"] = username
-            data["password"] = password
-            
-            with open(self.DATA_FILE, "w", encoding="utf-8") as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
+            self.store.update({"username": username, "password": password})
             logger.info("用户凭据保存成功")
         except Exception as e:
             logger.error(f"保存用户凭据失败: {e}")
 
+    def get_credentials(self) -> tuple[str, str]:
+        """获取保存的用户名和密码，用于自动重新登录"""
+        return self.store.get("username", ""), self.store.get("password", "")
+
     def load_user_data(self) -> None:
-        """从文件加载用户数据"""
-        if not os.path.exists(self.DATA_FILE):
+        """从用户数据存储加载用户数据（仅首次访问时读取文件）"""
+        if not self.store.exists():
             logger.warning("用户数据文件不存在")
             return
 
         try:
-            with open(self.DATA_FILE, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                self.user_data = data.get("user_info", {})
-                self.public_user_data = data.get("tokens", {})
-                self.HEADERS = data.get("headers", {})
-                self.studentId = data.get("user_info", {}).get("school", {}).get("studentId", {})
-                
-                # 恢复保存的clientSession和safeCode
-                session_data = data.get("session_data", {})
-                self.client_session_id = session_data.get("client_session_id")
-                self.safe_code = session_data.get("safe_code")
-                
+            data = self.store.snapshot()
+            self.user_data = data.get("user_info", {})
+            self.public_user_data = data.get("tokens", {})
+            self.HEADERS = data.get("headers", {})
+            self.studentId = data.get("user_info", {}).get("school", {}).get("studentId", {})
+
+            # 恢复保存的clientSession和safeCode
+            session_data = data.get("session_data", {})
+            self.client_session_id = session_data.get("client_session_id")
+            self.safe_code = session_data.get("safe_code")
+
             logger.info("用户数据加载成功")
         except Exception as e:
             logger.error(f"加载用户数据失败: {e}")
 
-    def login(self, username: str, password: str) -> bool:
-        """用户登录主方法，如果 Token 未过期且账号有效则直接返回成功"""
-        if self.is_token_valid(self.public_user_data.get("token")) and self.check_current_account_valid():
+    def login(self, username: str, password: str, force: bool = False) -> bool:
+        """用户登录主方法，如果 Token 未过期且账号有效则直接返回成功；force 为 True 时总是重新登录"""
+        if not force and self.is_token_valid(self.public_user_data.get("token")) and self.check_current_account_valid():
             return True
 
         logger.info("Token 无效或账号无效，正在执行登录")
@@ -111,6 +112,8 @@ class AccountManager:
                 self._save_credentials(username, password)
                 logger.info("登录成功")
                 self.load_user_data()  # 登录成功后重新加载用户数据
+                # 刚登录成功的 Token 无需再请求接口确认有效性
+                self.mark_valid()
                 return True
 
             logger.error(f"登录失败: {response.get('msg', '未知错误') if response else '无响应'}")
@@ -182,8 +185,100 @@ class AccountManager:
             logger.error("Token 解码失败")
         return False
 
+    @staticmethod
+    def get_token_expiry(token: Optional[str]) -> Optional[int]:
+        """返回 Token 的过期时间戳（秒），无法解析时返回 None"""
+        if not token:
+            return None
+        try:
+            return int(jwt.decode(token, options={"verify_signature": False}).get("exp", 0)) or None
+        except (jwt.DecodeError, TypeError, ValueError):
+            return None
+
+    def refresh_login(self) -> bool:
+        """使用保存的凭据强制重新登录，刷新 Token 与 SafeCode"""
+        username, password = self.get_credentials()
+        if not username or not password:
+            logger.error("未找到保存的用户名和密码，无法刷新登录")
+            return False
+        return self.login(username, password, force=True)
+
+    def relogin(self, force: bool = False) -> bool:
+        """
+        登录可能失效时重新登录。
+
+        默认不强制：Token 未过期且账号有效性检查通过（结果按 Token 缓存）时直接返回成功，
+        一次超时或 5xx 不会丢弃仍然有效的会话；收到登录失效响应的调用方应先 invalidate_validity(token)。
+        force 为 True 时总是重新登录，仅用于 Token 即将过期的主动刷新。
+
+        并发调用合并为一次：第一个调用者执行登录，其余调用者等待并共享其结果；
+        上次实际登录完成后的 RELOGIN_COOLDOWN 秒内不再重复登录，直接返回上次结果，
+        避免多个会话同时收到登录失效时各自登录、互相覆盖 client_session_id。
+        """
+        return relogin_group.do((self.DATA_FILE, force), lambda: self._relogin_once(force))
+
+    def _relogin_once(self, force: bool) -> bool:
+        if self._last_relogin is not None:
+            finished_at, result = self._last_relogin
+            if time.monotonic() - finished_at < RELOGIN_COOLDOWN:
+                RELOGINS.inc(result="cooldown")
+                logger.info("距上次重新登录不足冷却时间，复用上次结果")
+                return result
+        username, password = self.get_credentials()
+        if not username or not password:
+            logger.error("未找到保存的用户名和密码，无法重新登录")
+            RELOGINS.inc(result="failure")
+            return False
+        token = self.public_user_data.get("token")
+        try:
+            result = self.login(username, password, force=force)
+        except Exception:
+            RELOGINS.inc(result="error")
+            raise
+        if result and self.public_user_data.get("token") == token:
+            # 会话仍然有效，未实际登录，不进入冷却
+            RELOGINS.inc(result="still_valid")
+            return True
+        RELOGINS.inc(result="success" if result else "failure")
+        self._last_relogin = (time.monotonic(), result)
+        return result
+
     def check_current_account_valid(self):
-        """检查当前账户是否有效（使用动态加密）"""
+        """
+        检查当前账户是否有效，结果按 Token 缓存 ACCOUNT_VALIDITY_TTL 秒。
+
+        Token 变化或收到登录失效响应（invalidate_validity）时重新检查。
+        """
+        token = self.public_user_data.get("token")
+        with self._validity_lock:
+            if self._validity is not None:
+                cached_token, valid, checked_at = self._validity
+                if cached_token == token and time.monotonic() - checked_at < ACCOUNT_VALIDITY_TTL:
+                    return valid
+
+        valid = self._request_account_valid()
+        with self._validity_lock:
+            self._validity = (token, valid, time.monotonic())
+        return valid
+
+    def mark_valid(self) -> None:
+        """记录当前 Token 有效，在登录成功或任何请求正常返回时调用，使重新登录前的检查命中缓存"""
+        with self._validity_lock:
+            self._validity = (self.public_user_data.get("token"), True, time.monotonic())
+
+    def invalidate_validity(self, token: Optional[str] = None) -> None:
+        """
+        作废缓存的账户有效性结果，在任何请求返回登录失效时调用。
+
+        传入发起请求时使用的 Token 时，只作废该 Token 的结果：
+        并发请求中较晚返回的失效响应不会清掉重新登录后新 Token 的缓存。
+        """
+        with self._validity_lock:
+            if token is None or (self._validity is not None and self._validity[0] == token):
+                self._validity = None
+
+    def _request_account_valid(self) -> bool:
+        """请求 /member/user/vip 检查当前账户是否有效（使用动态加密）"""
         try:
             # 准备动态加密头部
             headers = self._prepare_dynamic_headers()
@@ -197,8 +292,8 @@ class AccountManager:
                     "accesstoken": self.public_user_data["accessToken"]
                 })
             
-            url = "https://www.xinjiaoyu.com/api/v3/server_system/member/user/vip"
-            response = get_content(url, headers, False, False)
+            url = f"{BASE_URL}/api/v3/server_system/member/user/vip"
+            response = get_content(url, headers, False, False, account=self.account_id)
             return response.get("code") == 200
             
         except Exception as e:
@@ -219,31 +314,36 @@ class AccountManager:
                     logger.warning("无法获取SafeCode，使用旧版加密")
                     return self.get_headers()
             
-            # 生成动态加密头部
-            timestamp = int(time.time() * 1000)
-            if hasattr(XinjiaoyuEncryptioner, 'get_dynamic_encrypt') and self.safe_code:
-                encrypt_val = XinjiaoyuEncryptioner.get_dynamic_encrypt(
-                    self.safe_code, timestamp, self.client_session_id, "applet"
-                )
-            else:
-                encrypt_val = XinjiaoyuEncryptioner.get_md5(str(timestamp), self.client_session_id)
-            
-            headers = {
-                "encrypt": encrypt_val,
-                "xweb_xhr": "1",
-                "clientsession": self.client_session_id,
-                "client": "applet",
-                "app": "student",
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36 MicroMessenger/7.0.20.1781(0x6700143B) NetType/WIFI MiniProgramEnv/Windows WindowsWechat/WMPF WindowsWechat(0x63090a13) UnifiedPCWindowsWechat(0xf2540621) XWEB/16203",
-                "t": str(timestamp)
-            }
-            
-            return headers
-            
+            # 生成动态加密头部：签名器缓存解密后的SafeCode与基础头部，每次只计算 t / encrypt
+            return self._get_signer().headers()
+
         except Exception as e:
             logger.error(f"准备动态头部时发生错误: {e}")
             return self.get_headers()
     
+    def _get_signer(self) -> RequestSigner:
+        """获取与当前 SafeCode 和会话ID 对应的签名器，二者变化时重建"""
+        signer = self._signer
+        if self._signer_matches(signer):
+            return signer
+        with self._signer_lock:
+            if not self._signer_matches(self._signer):
+                self._signer = RequestSigner(
+                    self.safe_code, self.client_session_id, "applet",
+                    base_headers={
+                        "xweb_xhr": "1",
+                        "clientsession": self.client_session_id,
+                        "client": "applet",
+                        "app": "student",
+                        "user-agent": self.USER_AGENT,
+                    }
+                )
+            return self._signer
+
+    def _signer_matches(self, signer: Optional[RequestSigner]) -> bool:
+        return (signer is not None and signer.safe_code == self.safe_code
+                and signer.client_session_id == self.client_session_id)
+
     def get_dynamic_headers(self) -> Optional[Dict[str, str]]:
         """获取动态加密的请求头部（供外部调用）"""
         headers = self._prepare_dynamic_headers()
@@ -268,17 +368,23 @@ class AccountManager:
         return XinjiaoyuEncryptioner.encrypt(data, self.ENCRYPTION_KEY)
 
     def _prepare_login_request(self, username: str, password: str) -> tuple[dict, dict]:
-        """准备登录请求所需数据（使用动态加密）"""
+        """
+        准备登录请求所需数据（使用动态加密）
+
+        新的会话ID和SafeCode先暂存，登录成功后才替换当前值，
+        避免后台刷新登录期间其他请求用到不匹配的会话ID与SafeCode
+        """
         # 生成客户端会话ID
-        self.client_session_id = XinjiaoyuEncryptioner.generate_client_session_id() if hasattr(XinjiaoyuEncryptioner, 'generate_client_session_id') else uuid.uuid4().hex
+        client_session_id = XinjiaoyuEncryptioner.generate_client_session_id() if hasattr(XinjiaoyuEncryptioner, 'generate_client_session_id') else uuid.uuid4().hex
         
         # 获取SafeCode
         if hasattr(XinjiaoyuEncryptioner, 'get_safe_code'):
-            self.safe_code = XinjiaoyuEncryptioner.get_safe_code(self.client_session_id)
+            safe_code = XinjiaoyuEncryptioner.get_safe_code(client_session_id)
         else:
-            self.safe_code = None
-            
-        if not self.safe_code:
+            safe_code = None
+        self._pending_session = (client_session_id, safe_code)
+
+        if not safe_code:
             logger.warning("无法获取SafeCode，使用旧版加密方式")
             # 回退到旧版加密方式
             t_val = str(int(time.time() * 1000))
@@ -293,7 +399,7 @@ class AccountManager:
                 'clientsession': client_session_val,
                 'client': "applet",
                 'app': "student",
-                'user-agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36 MicroMessenger/7.0.20.1781(0x6700143B) NetType/WIFI MiniProgramEnv/Windows WindowsWechat/WMPF WindowsWechat(0x63090a13) UnifiedPCWindowsWechat(0xf2540621) XWEB/16203",
+                'user-agent': self.USER_AGENT,
                 't': t_val
             }
             login_data = {"username": username, "password": password, "t": int(t_val)}
@@ -303,10 +409,10 @@ class AccountManager:
         timestamp = int(time.time() * 1000)
         if hasattr(XinjiaoyuEncryptioner, 'get_dynamic_encrypt'):
             encrypt_val = XinjiaoyuEncryptioner.get_dynamic_encrypt(
-                self.safe_code, timestamp, self.client_session_id, "applet"
+                safe_code, timestamp, client_session_id, "applet"
             )
         else:
-            encrypt_val = XinjiaoyuEncryptioner.get_md5(str(timestamp), self.client_session_id)
+            encrypt_val = XinjiaoyuEncryptioner.get_md5(str(timestamp), client_session_id)
         
         headers = {
             'Content-Type': "application/json",
@@ -314,10 +420,10 @@ class AccountManager:
             'authorization': "",
             'encrypt': encrypt_val,
             'xweb_xhr': "1",
-            'clientsession': self.client_session_id,
+            'clientsession': client_session_id,
             'client': "applet",
             'app': "student",
-            'user-agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36 MicroMessenger/7.0.20.1781(0x6700143B) NetType/WIFI MiniProgramEnv/Windows WindowsWechat/WMPF WindowsWechat(0x63090a13) UnifiedPCWindowsWechat(0xf2540621) XWEB/16203",
+            'user-agent': self.USER_AGENT,
             't': str(timestamp)
         }
         
@@ -335,7 +441,10 @@ class AccountManager:
             "accesstoken": self.public_user_data["accessToken"],
         })
         self.studentId = self.user_data.get("school", {}).get("studentId", {})
-        
+        if self._pending_session:
+            self.client_session_id, self.safe_code = self._pending_session
+            self._pending_session = None
+
         # 保存clientSession和safeCode到用户数据中，确保后续请求时能够重用
         session_data = {
             "client_session_id": self.client_session_id,
@@ -366,24 +475,13 @@ class AccountManager:
         return self.studentId
 
     def _make_request(self, url: str, headers: dict, json_data: dict) -> Optional[dict]:
-        """通用 POST 请求方法，带重试机制"""
-        for attempt in range(1, self.MAX_RETRIES + 1):
-            try:
-                response = requests.post(url, headers=headers, json=json_data, timeout=10)
-                if response.ok:
-                    logger.info(f"请求成功 (尝试 {attempt}/{self.MAX_RETRIES})")
-                    response_json = response.json()
-                    save_debug_http_record(
-                        method="POST",
-                        url=url,
-                        request_headers=headers,
-                        request_json=json_data,
-                        status_code=response.status_code,
-                        response_headers=response.headers,
-                        response_text=response.text,
-                        response_json=response_json
-                    )
-                    return response_json
+        """通用 POST 请求方法，重试由共享 HTTP 层按退避策略完成（登录请求可安全重放）"""
+        try:
+            response = http_session.request("POST", url, idempotent=True, retry_policy=self.RETRY_POLICY,
+                                            account=self.account_id, headers=headers, json=json_data)
+            if response.ok:
+                logger.info("请求成功")
+                response_json = response.json()
                 save_debug_http_record(
                     method="POST",
                     url=url,
@@ -391,19 +489,30 @@ class AccountManager:
                     request_json=json_data,
                     status_code=response.status_code,
                     response_headers=response.headers,
-                    response_text=response.text
+                    elapsed_ms=response.elapsed.total_seconds() * 1000,
+                    response_text=response.text,
+                    response_json=response_json
                 )
-                logger.error(f"请求失败 (尝试 {attempt}/{self.MAX_RETRIES}): {response.text}")
-            except requests.RequestException as e:
-                save_debug_http_record(
-                    method="POST",
-                    url=url,
-                    request_headers=headers,
-                    request_json=json_data,
-                    error_type=type(e).__name__,
-                    error_message=str(e)
-                )
-                logger.error(f"网络错误 (尝试 {attempt}/{self.MAX_RETRIES}): {e}")
-            time.sleep(1)
-        logger.error("达到最大重试次数，请求失败")
+                return response_json
+            save_debug_http_record(
+                method="POST",
+                url=url,
+                request_headers=headers,
+                request_json=json_data,
+                status_code=response.status_code,
+                response_headers=response.headers,
+                elapsed_ms=response.elapsed.total_seconds() * 1000,
+                response_text=response.text
+            )
+            logger.error(f"请求失败: {response.text}")
+        except requests.RequestException as e:
+            save_debug_http_record(
+                method="POST",
+                url=url,
+                request_headers=headers,
+                request_json=json_data,
+                error_type=type(e).__name__,
+                error_message=str(e)
+            )
+            logger.error(f"网络错误: {e}")
         return None
@@ -2,16 +2,20 @@ import base64
 import hashlib
 import random
 import time
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
 
-import requests
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 from loguru import logger
+from src.GetAnswer import http_session
 from src.GetAnswer.api_client import save_debug_http_record
+from src.GetAnswer.config import BASE_URL
 
 
 class XinjiaoyuEncryptioner:
+    ENCRYPTION_KEY = "6f0c5ba452b24fa28989e9524d77407a"
+
     @staticmethod
     def encrypt(raw_text: str, key: str) -> str:
         """
@@ -50,8 +54,7 @@ class XinjiaoyuEncryptioner:
         生成动态加密字符串
         """
         try:
-            ENCRYPTION_KEY = "6f0c5ba452b24fa28989e9524d77407a"
-            decrypted_safe_code = XinjiaoyuEncryptioner.decrypt(safe_code, ENCRYPTION_KEY)
+            decrypted_safe_code = XinjiaoyuEncryptioner.decrypt(safe_code, XinjiaoyuEncryptioner.ENCRYPTION_KEY)
             
             raw_data = decrypted_safe_code + str(timestamp) + client_session_id + client
             return hashlib.md5(raw_data.encode('utf-8')).hexdigest()
@@ -75,7 +78,7 @@ class XinjiaoyuEncryptioner:
         return str(t)
     
     @staticmethod
-    def get_safe_code(client_session_id: str, base_url: str = "https://www.xinjiaoyu.com") -> Optional[str]:
+    def get_safe_code(client_session_id: str, base_url: str = BASE_URL) -> Optional[str]:
         """
         获取SafeCode
         """
@@ -96,7 +99,7 @@ class XinjiaoyuEncryptioner:
             
             # 发送请求
             url = f"{base_url}/api/v3/server_system/system/code"
-            response = requests.get(url, params=params, timeout=10)
+            response = http_session.request("GET", url, params=params)
             
             if response.status_code == 200:
                 result = response.json()
@@ -106,6 +109,7 @@ class XinjiaoyuEncryptioner:
                     request_params=params,
                     status_code=response.status_code,
                     response_headers=response.headers,
+                    elapsed_ms=response.elapsed.total_seconds() * 1000,
                     response_text=response.text,
                     response_json=result
                 )
@@ -122,6 +126,7 @@ class XinjiaoyuEncryptioner:
                     request_params=params,
                     status_code=response.status_code,
                     response_headers=response.headers,
+                    elapsed_ms=response.elapsed.total_seconds() * 1000,
                     response_text=response.text
                 )
                 logger.error(f"请求SafeCode失败，状态码: {response.status_code}")
@@ -140,3 +145,42 @@ class XinjiaoyuEncryptioner:
             logger.error(f"获取SafeCode时发生错误: {e}")
             
         return None
+
+
+class RequestSigner:
+    """
+    高吞吐的请求签名器，与 get_dynamic_encrypt 结果一致。
+
+    SafeCode 只在创建时解密一次，并预先计算好以其为前缀的 MD5 状态；每次签名只复制该状态、
+    补上时间戳与会话后缀，返回 t / encrypt 两个变化字段。基础请求头创建后冻结，可在多线程间共享。
+    """
+
+    def __init__(self, safe_code: str, client_session_id: str, client: str = "applet",
+                 base_headers: Optional[Mapping[str, str]] = None):
+        try:
+            decrypted_safe_code = XinjiaoyuEncryptioner.decrypt(safe_code, XinjiaoyuEncryptioner.ENCRYPTION_KEY)
+        except ValueError as e:
+            logger.error(f"创建请求签名器失败: {e}")
+            raise
+        self.safe_code = safe_code
+        self.client_session_id = client_session_id
+        self._prefix_state = hashlib.md5(decrypted_safe_code.encode('utf-8'))
+        self._suffix = (client_session_id + client).encode('utf-8')
+        self.base_headers = MappingProxyType(dict(base_headers or {}))
+
+    def sign(self, timestamp: Optional[int] = None) -> dict:
+        """生成单次请求的 t / encrypt 字段"""
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        t_value = str(timestamp)
+        # hashlib 对象的 copy 在内部加锁，多线程共享前缀状态是安全的
+        digest = self._prefix_state.copy()
+        digest.update(t_value.encode('ascii'))
+        digest.update(self._suffix)
+        return {"t": t_value, "encrypt": digest.hexdigest()}
+
+    def headers(self, timestamp: Optional[int] = None) -> dict:
+        """基础请求头 + 本次签名字段"""
+        headers = dict(self.base_headers)
+        headers.update(self.sign(timestamp))
+        return headers
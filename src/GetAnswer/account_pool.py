@@ -0,0 +1,204 @@
+import itertools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from loguru import logger
+
+from src.GetAnswer.AccountManager import AccountManager
+from src.GetAnswer.config import (
+    ACCOUNT_FAILURE_COOLDOWN,
+    ACCOUNT_MAX_FAILURES,
+    ACCOUNT_SELECTION,
+)
+
+
+class PooledAccount:
+    """账号池中的一个账号：AccountManager 加上负载与健康状态。"""
+
+    def __init__(self, username, password, subjects=(), data_file=None):
+        self.username = username
+        self.password = password
+        self.subjects = set(subjects or ())  # 配置的学科
+        self.learned_subjects = set()  # 解析模板成功时得知的学科
+        self.manager = AccountManager(data_file=data_file)
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.total_requests = 0
+        self.total_failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def coverage(self, subject) -> int:
+        """
+        账号对学科的覆盖程度：2 确定覆盖（已配置或解析过该学科的模板），1 未知，0 确定不覆盖。
+
+        未配置学科的账号视为可能覆盖任意学科。
+        """
+        if not subject:
+            return 1
+        if subject in self.subjects or subject in self.learned_subjects:
+            return 2
+        return 0 if self.subjects else 1
+
+    def covers(self, subject) -> bool:
+        return self.coverage(subject) > 0
+
+    def snapshot(self) -> dict:
+        return {
+            "username": self.username,
+            "subjects": sorted(self.subjects),
+            "learned_subjects": sorted(self.learned_subjects),
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+        }
+
+
+class AccountPool:
+    """
+    多账号池：按学科覆盖排序账号，同一档内在健康账号间轮询或按负载选择，
+    连续失败的账号暂时摘除，冷却后自动恢复。
+
+    paperID 只能用选修了对应学科的账号解析，因此还会记住每个模板编号的学科、由哪个账号解析成功、
+    哪些账号解析失败，后续同一模板优先路由到能解析的账号，同学科的模板优先路由到覆盖该学科的账号。
+    """
+
+    def __init__(self, accounts, selection=ACCOUNT_SELECTION, max_failures=ACCOUNT_MAX_FAILURES,
+                 failure_cooldown=ACCOUNT_FAILURE_COOLDOWN):
+        if not accounts:
+            raise ValueError("账号池至少需要一个账号")
+        data_files = [self._data_file_for(item, len(accounts)) for item in accounts]
+        # 共用数据文件的账号会共用凭据存储、限流桶与重新登录，一个账号的重新登录会覆盖另一个账号的 Token
+        resolved = [os.path.abspath(data_file or AccountManager.DATA_FILE) for data_file in data_files]
+        duplicates = sorted({path for path in resolved if resolved.count(path) > 1})
+        if duplicates:
+            raise ValueError(f"多个账号使用了同一个用户数据文件: {duplicates}")
+        self.accounts = [
+            PooledAccount(item["username"], item["password"], item.get("subjects"), data_file)
+            for item, data_file in zip(accounts, data_files)
+        ]
+        self.selection = selection
+        self.max_failures = max_failures
+        self.failure_cooldown = failure_cooldown
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+        self._template_owners = {}
+        self._template_subjects = {}
+        self._template_misses = {}  # 模板编号 -> 未能解析该模板的账号
+
+    @staticmethod
+    def _data_file_for(item, account_count) -> Optional[str]:
+        """单个账号沿用默认的 user_data.json；多个账号未指定 data_file 时按用户名各自使用独立文件"""
+        if item.get("data_file") or account_count == 1:
+            return item.get("data_file")
+        return f"user_data_{re.sub(r'[^0-9A-Za-z_.-]', '_', str(item['username']))}.json"
+
+    def login_all(self) -> int:
+        """登录所有账号，返回登录成功的数量"""
+        success_count = 0
+        for account in self.accounts:
+            if account.manager.login(account.username, account.password):
+                success_count += 1
+            else:
+                logger.error(f"账号 {account.username} 登录失败")
+                self._mark_unhealthy(account)
+        logger.info(f"账号池登录完成: {success_count}/{len(self.accounts)}")
+        return success_count
+
+    def candidates(self, subject: Optional[str] = None, template_code: Optional[str] = None) -> list:
+        """
+        按优先级返回全部账号：已知能解析该模板的健康账号 > 确定覆盖该学科的账号 > 学科未知的账号
+        > 确定不覆盖的账号 > 解析该模板失败过的账号；同一档内健康账号在前，并按选择策略排序。
+
+        未传入学科时使用该模板编号上次解析得到的学科。
+        """
+        with self._lock:
+            if template_code:
+                subject = subject or self._template_subjects.get(template_code)
+                owner = self._template_owners.get(template_code)
+                misses = self._template_misses.get(template_code, ())
+            else:
+                owner, misses = None, ()
+            if self.selection == "round_robin":
+                offset = next(self._round_robin) % len(self.accounts)
+                ordered = self.accounts[offset:] + self.accounts[:offset]
+            else:
+                ordered = sorted(self.accounts, key=lambda account: (account.in_flight, account.total_requests))
+            # 稳定排序，同一档内保留选择策略给出的顺序
+            ordered.sort(key=lambda account: (
+                not (account is owner and account.healthy),
+                account in misses,
+                -account.coverage(subject),
+                not account.healthy,
+            ))
+        return ordered
+
+    def select(self, subject: Optional[str] = None, template_code: Optional[str] = None) -> PooledAccount:
+        return self.candidates(subject, template_code)[0]
+
+    @contextmanager
+    def use(self, account: PooledAccount):
+        """在 with 块内把账号计为进行中的请求"""
+        with self._lock:
+            account.in_flight += 1
+            account.total_requests += 1
+        try:
+            yield account.manager
+        finally:
+            with self._lock:
+                account.in_flight -= 1
+
+    def report_success(self, account: PooledAccount, template_code: Optional[str] = None,
+                       subject: Optional[str] = None) -> None:
+        with self._lock:
+            account.consecutive_failures = 0
+            account.unhealthy_until = 0.0
+            if template_code:
+                self._template_owners[template_code] = account
+                if subject:
+                    self._template_subjects[template_code] = subject
+            if subject:
+                account.learned_subjects.add(subject)
+
+    def report_miss(self, account: PooledAccount, template_code: str) -> None:
+        """
+        账号未能解析模板（通常是未选修对应学科）：只影响该模板的路由顺序，不计入失败次数，
+        避免把未选修当作账号故障而摘除健康账号。
+        """
+        with self._lock:
+            self._template_misses.setdefault(template_code, set()).add(account)
+
+    def template_subject(self, template_code: str) -> Optional[str]:
+        """模板编号上次解析得到的学科"""
+        with self._lock:
+            return self._template_subjects.get(template_code)
+
+    def report_failure(self, account: PooledAccount) -> None:
+        with self._lock:
+            account.consecutive_failures += 1
+            account.total_failures += 1
+            if account.consecutive_failures >= self.max_failures:
+                self._mark_unhealthy(account)
+
+    def _mark_unhealthy(self, account: PooledAccount) -> None:
+        account.unhealthy_until = time.monotonic() + self.failure_cooldown
+        logger.warning(f"账号 {account.username} 暂时摘除 {self.failure_cooldown} 秒")
+
+    def find(self, manager: AccountManager) -> Optional[PooledAccount]:
+        for account in self.accounts:
+            if account.manager is manager:
+                return account
+        return None
+
+    def stats(self) -> list:
+        with self._lock:
+            return [account.snapshot() for account in self.accounts]
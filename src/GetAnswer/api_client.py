@@ -1,20 +1,35 @@
-import json
+import atexit
 import os
+import random
+import re
+import time
 from datetime import datetime
 from urllib.parse import parse_qs, urlsplit
 
 import requests
 from loguru import logger
-from pywebio.output import put_text
+
+from src.GetAnswer import events, http_session
+from src.GetAnswer.config import DEBUG_RECORD_LEVEL, DEBUG_RECORD_MAX_BODY_BYTES, DEBUG_RECORD_SAMPLE_RATES
+from src.GetAnswer.debug_recorder import DebugRecordWriter
+from src.GetAnswer.metrics import UPSTREAM_LATENCY, endpoint_label
+from src.GetAnswer.payloads import loads
+from src.GetAnswer.response_cache import response_cache
 
 
 SENSITIVE_KEYS = {"authorization", "accesstoken", "token", "password", "cookie", "set-cookie"}
 ENABLE_DEBUG_RECORD = True
+DEBUG_RECORD_LEVELS = ("off", "errors", "metadata", "full")
 DEBUG_RECORD_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
     "debug_api_records"
 )
 DEBUG_RECORD_FILE = os.path.join(DEBUG_RECORD_DIR, "api_debug_records.jsonl")
+debug_record_writer = DebugRecordWriter(DEBUG_RECORD_FILE)
+atexit.register(debug_record_writer.close)
+LOGIN_EXPIRED_CODES = (410, 416)
+LOGIN_EXPIRED_KEYWORDS = ("请先登录", "请重新登录")
+_DEBUG_SAMPLE_RULES = [(re.compile(pattern), rate) for pattern, rate in DEBUG_RECORD_SAMPLE_RATES]
 
 
 def _mask_sensitive_data(data):
@@ -33,16 +48,67 @@ def _mask_sensitive_data(data):
     return data
 
 
+def _is_error_record(status_code, response_json, error_type):
+    """请求异常、HTTP 状态码非 200 或业务 code 非 200 都视为失败请求。"""
+    if error_type or (status_code is not None and status_code != 200):
+        return True
+    return isinstance(response_json, dict) and response_json.get("code") not in (None, 200)
+
+
+def _sample_rate_for(path):
+    for pattern, rate in _DEBUG_SAMPLE_RULES:
+        if pattern.search(path):
+            return rate
+    return 1.0
+
+
+def _should_record(path, is_error):
+    """根据记录级别和采样率决定是否记录本次请求，失败请求不参与采样。"""
+    level = DEBUG_RECORD_LEVEL if ENABLE_DEBUG_RECORD else "off"
+    if level not in DEBUG_RECORD_LEVELS:
+        level = "full"
+    if level == "off":
+        return False
+    if is_error:
+        return True
+    if level == "errors":
+        return False
+    return random.random() < _sample_rate_for(path)
+
+
+def _build_body_fields(response_text, response_json):
+    """
+    只保存一份响应体：优先保存解析后的 JSON，超过上限时改存截断后的原文。
+    """
+    body_size = len(response_text.encode("utf-8")) if response_text else 0
+    fields = {"response_size": body_size}
+    if DEBUG_RECORD_LEVEL == "metadata":
+        return fields
+    if body_size > DEBUG_RECORD_MAX_BODY_BYTES:
+        truncated = response_text.encode("utf-8")[:DEBUG_RECORD_MAX_BODY_BYTES]
+        fields["response_text"] = truncated.decode("utf-8", errors="ignore")
+        fields["response_truncated"] = True
+    elif response_json is not None:
+        fields["response_json"] = response_json
+    else:
+        fields["response_text"] = response_text
+    return fields
+
+
 def save_debug_http_record(method, url, request_headers=None, request_params=None, request_json=None,
                            status_code=None, response_headers=None, response_text=None, response_json=None,
-                           error_type=None, error_message=None):
-    """按行写入 HTTP 调试记录，便于后续分析接口结构。"""
-    if not ENABLE_DEBUG_RECORD:
-        return
+                           error_type=None, error_message=None, elapsed_ms=None):
+    """
+    将 HTTP 调试记录交给后台线程按行写入，便于后续分析接口结构。
 
+    是否记录、记录哪些内容由 DEBUG_RECORD_LEVEL 与 DEBUG_RECORD_SAMPLE_RATES 决定。
+    """
     try:
-        os.makedirs(DEBUG_RECORD_DIR, exist_ok=True)
         parsed_url = urlsplit(url)
+        is_error = _is_error_record(status_code, response_json, error_type)
+        if not _should_record(parsed_url.path, is_error):
+            return
+
         record = {
             "timestamp": datetime.now().isoformat(timespec="seconds"),
             "method": method,
@@ -51,21 +117,42 @@ def save_debug_http_record(method, url, request_headers=None, request_params=Non
             "query": parse_qs(parsed_url.query),
             "request_headers": _mask_sensitive_data(request_headers or {}),
             "request_params": request_params,
-            "request_json": _mask_sensitive_data(request_json),
             "status_code": status_code,
+            "elapsed_ms": round(elapsed_ms, 1) if elapsed_ms is not None else None,
             "response_headers": dict(response_headers) if response_headers else {},
-            "response_text": response_text,
-            "response_json": response_json,
             "error_type": error_type,
             "error_message": error_message
         }
-        with open(DEBUG_RECORD_FILE, "a", encoding="utf-8") as file:
-            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if DEBUG_RECORD_LEVEL != "metadata":
+            record["request_json"] = _mask_sensitive_data(request_json)
+        record.update(_build_body_fields(response_text, response_json))
+        debug_record_writer.submit(record)
     except Exception as save_error:
         logger.error(f"保存调试记录失败: {save_error}")
 
 
-def get_content(url, headers=None, log_visual=True, enable_log=True):
+def is_login_expired(response_data):
+    """根据响应的 code 和 msg 判断登录状态是否已失效。"""
+    if not isinstance(response_data, dict):
+        return False
+    if response_data.get("code") in LOGIN_EXPIRED_CODES:
+        return True
+    msg = response_data.get("msg")
+    return isinstance(msg, str) and any(keyword in msg for keyword in LOGIN_EXPIRED_KEYWORDS)
+
+
+def upstream_outcome(response_data):
+    """将响应归类为监控指标中的 outcome 标签"""
+    if not isinstance(response_data, dict):
+        return "failed"
+    if response_data.get('code') == 200:
+        return "ok"
+    if is_login_expired(response_data):
+        return "login_expired"
+    return "error"
+
+
+def get_content(url, headers=None, log_visual=True, enable_log=True, use_cache=True, refresh=False, account=None):
     """
     发送 GET 请求并返回 JSON 数据。
 
@@ -74,6 +161,9 @@ def get_content(url, headers=None, log_visual=True, enable_log=True):
     - headers: 请求头，可选。
     - log_visual: 是否在页面输出请求提示。
     - enable_log: 是否输出日志。
+    - use_cache: 是否使用响应缓存，仅对配置了缓存时间的接口生效。
+    - refresh: 跳过缓存读取直接请求上游，并用新的响应更新缓存（用于重新生成等需要最新数据的场景）。
+    - account: 发起请求的账号标识（AccountManager.account_id），用于按账号限流。
 
     返回:
     - dict: 解析成功后的 JSON 数据。
@@ -85,10 +175,26 @@ def get_content(url, headers=None, log_visual=True, enable_log=True):
     if enable_log:
         logger.info(f"请求地址: {safe_url}")
         if log_visual:
-            put_text(f"请求地址: {safe_url}")
+            events.publish(events.INFO, f"请求地址: {safe_url}")
+
+    if use_cache and not refresh:
+        cached_json = response_cache.get(url)
+        if cached_json is not None:
+            if enable_log:
+                logger.info(f"命中响应缓存: {safe_url}")
+            return cached_json
+
+    # 只统计真正发往上游的请求，缓存命中不计入耗时分布
+    started = time.perf_counter()
+    response_json = _request_json(url, headers, safe_url, use_cache, account)
+    UPSTREAM_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint_label(url),
+                             outcome=upstream_outcome(response_json))
+    return response_json
+
 
+def _request_json(url, headers, safe_url, use_cache, account):
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_session.request("GET", url, account=account, headers=headers)
         if response.status_code != 200:
             logger.warning(f"请求失败: {safe_url}，状态码: {response.status_code}")
             save_debug_http_record(
@@ -97,22 +203,27 @@ def get_content(url, headers=None, log_visual=True, enable_log=True):
                 request_headers=headers,
                 status_code=response.status_code,
                 response_headers=response.headers,
+                elapsed_ms=response.elapsed.total_seconds() * 1000,
                 response_text=response.text
             )
-            put_text(f"获取数据失败，状态码：{response.status_code}")
+            events.publish(events.ERROR, f"获取数据失败，状态码：{response.status_code}")
             return None
 
         try:
-            response_json = response.json()
+            response_json = loads(response.content)
             save_debug_http_record(
                 method="GET",
                 url=url,
                 request_headers=headers,
                 status_code=response.status_code,
                 response_headers=response.headers,
+                elapsed_ms=response.elapsed.total_seconds() * 1000,
                 response_text=response.text,
                 response_json=response_json
             )
+            # 只缓存业务成功的响应，避免把登录失效等结果缓存下来
+            if use_cache and isinstance(response_json, dict) and response_json.get("code") == 200:
+                response_cache.set(url, response.text)
             return response_json
         except ValueError:
             logger.error(f"响应解析失败: {safe_url}")
@@ -122,11 +233,12 @@ def get_content(url, headers=None, log_visual=True, enable_log=True):
                 request_headers=headers,
                 status_code=response.status_code,
                 response_headers=response.headers,
+                elapsed_ms=response.elapsed.total_seconds() * 1000,
                 response_text=response.text,
                 error_type="ValueError",
                 error_message="响应内容不是有效JSON"
             )
-            put_text("获取数据时出现错误：无效的响应格式。")
+            events.publish(events.ERROR, "获取数据时出现错误：无效的响应格式。")
             return None
     except requests.exceptions.RequestException as error:
         logger.error(f"网络请求异常: {safe_url}，错误: {error}")
@@ -137,7 +249,7 @@ def get_content(url, headers=None, log_visual=True, enable_log=True):
             error_type=type(error).__name__,
             error_message=str(error)
         )
-        put_text("网络请求失败，请检查您的网络连接。")
+        events.publish(events.ERROR, "网络请求失败，请检查您的网络连接。")
         return None
     except Exception as error:
         logger.error(f"未知异常: {safe_url}，错误: {error}")
@@ -148,5 +260,5 @@ def get_content(url, headers=None, log_visual=True, enable_log=True):
             error_type=type(error).__name__,
             error_message=str(error)
         )
-        put_text("发生未知错误。请稍后重试。")
+        events.publish(events.ERROR, "发生未知错误。请稍后重试。")
         return None
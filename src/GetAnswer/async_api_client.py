@@ -0,0 +1,201 @@
+import asyncio
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from src.GetAnswer import events
+from src.GetAnswer.api_client import is_login_expired, save_debug_http_record
+from src.GetAnswer.config import (
+    ASYNC_HTTP2,
+    ASYNC_MAX_CONCURRENCY,
+    HTTP_POOL_MAXSIZE,
+    HTTP_TIMEOUT,
+    RETRY_STATUS_CODES,
+)
+from src.GetAnswer.http_session import ACCEPT_ENCODING
+from src.GetAnswer.metrics import endpoint_label
+from src.GetAnswer.rate_limiter import rate_limiter
+from src.GetAnswer.retry import CircuitOpenError, get_breaker
+
+try:
+    import httpx
+except ImportError:  # 可选依赖，仅在使用异步客户端时需要
+    httpx = None
+
+
+class AsyncUpstreamClient:
+    """
+    get_content 的异步版本，基于 httpx，在同一条 HTTP/2 连接上多路复用请求，
+    并用信号量限制同时在途的请求数。与同步请求共用进程级的限流器和按接口的熔断器。
+
+    用法:
+        async with AsyncUpstreamClient() as client:
+            results = await client.get_many([(url, headers), ...])
+    """
+
+    def __init__(self, max_concurrency=ASYNC_MAX_CONCURRENCY, http2=ASYNC_HTTP2, timeout=HTTP_TIMEOUT):
+        if httpx is None:
+            raise RuntimeError("异步客户端需要安装 httpx：pip install 'httpx[http2]'")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE, max_keepalive_connections=HTTP_POOL_MAXSIZE),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def get_content(self, url, headers=None, log_visual=True, enable_log=True, account=None):
+        """
+        异步发送 GET 请求并返回 JSON 数据，返回约定与 api_client.get_content 相同。
+
+        account 为限流使用的账号标识（AccountManager.account_id）。
+
+        返回:
+        - dict: 解析成功后的 JSON 数据。
+        - None: 请求失败或响应不可解析。
+        """
+        safe_url = urlsplit(url).path
+
+        if enable_log:
+            logger.info(f"请求地址: {safe_url}")
+            if log_visual:
+                events.publish(events.INFO, f"请求地址: {safe_url}")
+
+        breaker = get_breaker(endpoint_label(url))
+        try:
+            breaker.before_call()
+            # 限流器按令牌桶阻塞等待，放到线程中执行以免阻塞事件循环
+            await asyncio.to_thread(rate_limiter.acquire, url, account)
+            async with self._semaphore:
+                try:
+                    response = await self._client.get(url, headers=headers)
+                except httpx.HTTPError:
+                    breaker.record_failure()
+                    raise
+            if response.status_code >= 500 or response.status_code in RETRY_STATUS_CODES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code != 200:
+                logger.warning(f"请求失败: {safe_url}，状态码: {response.status_code}")
+                save_debug_http_record(
+                    method="GET",
+                    url=url,
+                    request_headers=headers,
+                    status_code=response.status_code,
+                    response_headers=response.headers,
+                    elapsed_ms=response.elapsed.total_seconds() * 1000,
+                    response_text=response.text
+                )
+                events.publish(events.ERROR, f"获取数据失败，状态码：{response.status_code}")
+                return None
+
+            try:
+                response_json = response.json()
+                save_debug_http_record(
+                    method="GET",
+                    url=url,
+                    request_headers=headers,
+                    status_code=response.status_code,
+                    response_headers=response.headers,
+                    elapsed_ms=response.elapsed.total_seconds() * 1000,
+                    response_text=response.text,
+                    response_json=response_json
+                )
+                return response_json
+            except ValueError:
+                logger.error(f"响应解析失败: {safe_url}")
+                save_debug_http_record(
+                    method="GET",
+                    url=url,
+                    request_headers=headers,
+                    status_code=response.status_code,
+                    response_headers=response.headers,
+                    elapsed_ms=response.elapsed.total_seconds() * 1000,
+                    response_text=response.text,
+                    error_type="ValueError",
+                    error_message="响应内容不是有效JSON"
+                )
+                events.publish(events.ERROR, "获取数据时出现错误：无效的响应格式。")
+                return None
+        except (httpx.HTTPError, CircuitOpenError) as error:
+            logger.error(f"网络请求异常: {safe_url}，错误: {error}")
+            save_debug_http_record(
+                method="GET",
+                url=url,
+                request_headers=headers,
+                error_type=type(error).__name__,
+                error_message=str(error)
+            )
+            events.publish(events.ERROR, "网络请求失败，请检查您的网络连接。")
+            return None
+        except Exception as error:
+            logger.error(f"未知异常: {safe_url}，错误: {error}")
+            save_debug_http_record(
+                method="GET",
+                url=url,
+                request_headers=headers,
+                error_type=type(error).__name__,
+                error_message=str(error)
+            )
+            events.publish(events.ERROR, "发生未知错误。请稍后重试。")
+            return None
+
+    async def get_many(self, requests_list, log_visual=False, enable_log=True):
+        """
+        并发获取多个地址，结果顺序与输入一致。
+
+        参数:
+        - requests_list: (url, headers) 或 (url, headers, account) 元组列表。
+        """
+        return await asyncio.gather(*(
+            self.get_content(request[0], request[1], log_visual, enable_log, *request[2:]) for request in requests_list
+        ))
+
+    async def api_request(self, url, headers_factory, description, identifier=None, expect_data=True, relogin=None,
+                          account=None):
+        """
+        与 main.generic_api_request 对应的异步请求，统一处理登录失效检测与重试。
+
+        参数:
+        - headers_factory: 返回请求头的无参函数，重新登录后会再次调用以获取新凭证。
+        - relogin: 登录失效时调用的同步函数，返回是否重新登录成功；为 None 时不重试。
+        - account: 限流使用的账号标识（AccountManager.account_id）。
+
+        返回:
+        - dict: 成功的响应数据。
+        - None: 请求失败、登录失效或 data 为空。
+        """
+        response_data = await self.get_content(url, headers_factory(), log_visual=False, account=account)
+        if response_data is None:
+            logger.warning(f"{description}响应数据为None - 标识符: {identifier}")
+            return None
+
+        if response_data.get("code") == 200:
+            if expect_data and not response_data.get("data"):
+                logger.warning(f"{description}成功但data字段为空 - 标识符: {identifier}")
+                return None
+            return response_data
+
+        if is_login_expired(response_data):
+            logger.warning(f"检测到登录失效 - {description}, 标识符: {identifier}")
+            # 重新登录是同步流程，放到线程中执行以免阻塞事件循环
+            if relogin and await asyncio.to_thread(relogin):
+                logger.info(f"重新登录成功，重试获取{description}")
+                return await self.api_request(url, headers_factory, description, identifier, expect_data, None,
+                                              account)
+            logger.error(f"自动重新登录失败 - {description}")
+            return None
+
+        logger.warning(f"获取{description}失败: 错误码 {response_data.get('code')}, "
+                       f"错误信息: {response_data.get('msg')} - 标识符: {identifier}")
+        return None
@@ -0,0 +1,208 @@
+"""
+批量生成答案页面的命令行工具，用于在作业集中发布前预先生成大量页面。
+
+用法:
+    python src/GetAnswer/batch.py codes.txt --workers 8
+    cat codes.txt | python src/GetAnswer/batch.py -
+
+输入每行一个模板编号或题卡二维码内容（& 及其后的参数会被去掉），空行和 # 开头的行会被忽略。
+处理结果逐条追加到检查点文件，重新运行时跳过检查点中已成功且页面存储中仍未过期的编号；
+页面过期（渲染器版本变化、文件丢失或超过 OUTPUT_MAX_AGE）时即使检查点记录为成功也会重新生成。
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from loguru import logger
+
+from src.GetAnswer import events, http_session
+from src.GetAnswer.AccountManager import AccountManager
+from src.GetAnswer.account_pool import AccountPool
+from src.GetAnswer.config import ACCOUNTS, BATCH_CHECKPOINT_FILE, BATCH_WORKERS, OUTPUT_DIR, TOKEN_REFRESH_ENABLED
+from src.GetAnswer.jobs import BACKGROUND, JobQueue
+from src.GetAnswer.metrics import OUTPUT_CACHE_HITS
+from src.GetAnswer.output_store import get_output_store
+from src.GetAnswer.pipeline import normalize_template_code
+from src.GetAnswer.token_refresher import TokenRefreshScheduler
+
+
+def read_template_codes(lines):
+    """规范化并去重模板编号，保持输入顺序"""
+    codes = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        code = normalize_template_code(line)
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+class Checkpoint:
+    """以 JSON Lines 追加记录每个模板的处理结果，同一编号以最后一条记录为准。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.records = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 中断时可能留下半行
+                    self.records[record.get("code")] = record
+
+    def is_done(self, code) -> bool:
+        return self.records.get(code, {}).get("status") == "done"
+
+    def record(self, code, status, **fields):
+        record = {"code": code, "status": status, "time": time.strftime("%Y-%m-%d %H:%M:%S"), **fields}
+        with self._lock:
+            self.records[code] = record
+            if not self.path:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+def run_batch(codes, account_pool, workers=BATCH_WORKERS, checkpoint=None, output_folder=OUTPUT_DIR, force=False,
+              job_queue=None):
+    """
+    以后台优先级把页面生成任务提交到任务队列并等待完成。
+
+    传入正在服务交互请求的 job_queue 时在该队列中预生成，交互请求会优先于这些任务执行；
+    否则新建一个 workers 个线程的队列。
+
+    Returns:
+        dict: 汇总结果，包含 done / skipped / failed 列表与耗时统计。
+    """
+    checkpoint = checkpoint or Checkpoint(None)
+    store = job_queue.store if job_queue else get_output_store(output_folder)
+    pending = []
+    skipped = []
+    for code in codes:
+        if not force and checkpoint.is_done(code) and store.get_fresh(code):
+            skipped.append(code)
+        else:
+            pending.append(code)
+    if skipped:
+        OUTPUT_CACHE_HITS.inc(len(skipped))
+        logger.info(f"跳过 {len(skipped)} 个已生成的模板")
+
+    done, failed, durations = [], [], []
+    started = time.perf_counter()
+    job_queue = job_queue or JobQueue(account_pool, workers, store).start()
+    # --force 时按重新生成处理：跳过响应缓存，基于上次保存的原始数据增量生成
+    jobs = [(code, job_queue.submit(code, priority=BACKGROUND, incremental=force)) for code in pending]
+    for index, (code, job) in enumerate(jobs, 1):
+        job.wait()
+        seconds = job.duration
+        durations.append(seconds)
+        if job.status == job.DONE and job.record:
+            checkpoint.record(code, "done", file=job.record.path, name=job.record.template_name,
+                              seconds=round(seconds, 3))
+            done.append(code)
+            print(f"[{index}/{len(pending)}] ✓ {code} {job.record.template_name} ({seconds:.1f}s)", flush=True)
+        else:
+            error = str(job.error) if job.error else "获取模板数据失败"
+            checkpoint.record(code, "failed", error=error, seconds=round(seconds, 3))
+            failed.append((code, error))
+            print(f"[{index}/{len(pending)}] ✗ {code} {error} ({seconds:.1f}s)", flush=True)
+
+    return {
+        "done": done,
+        "skipped": skipped,
+        "failed": failed,
+        "elapsed": time.perf_counter() - started,
+        "durations": durations,
+    }
+
+
+def print_summary(summary):
+    elapsed = summary["elapsed"]
+    durations = summary["durations"]
+    processed = len(summary["done"]) + len(summary["failed"])
+    print("\n==== 批量生成完成 ====")
+    print(f"成功 {len(summary['done'])}，失败 {len(summary['failed'])}，跳过 {len(summary['skipped'])}，"
+          f"总耗时 {elapsed:.1f}s")
+    if processed:
+        print(f"吞吐量 {processed / elapsed * 60 if elapsed else 0:.1f} 个/分钟，"
+              f"单个耗时 p50 {_percentile(durations, 0.5):.2f}s / p95 {_percentile(durations, 0.95):.2f}s / "
+              f"最大 {max(durations):.2f}s")
+    for code, error in summary["failed"]:
+        print(f"  ✗ {code}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成作业答案页面")
+    parser.add_argument("input", nargs="?", default="-", help="模板编号列表文件，- 表示从标准输入读取")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="同时处理的模板数")
+    parser.add_argument("--checkpoint", default=BATCH_CHECKPOINT_FILE, help="检查点文件，传入空字符串表示不记录")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="页面存储目录")
+    parser.add_argument("--force", action="store_true", help="忽略检查点与已存在的页面，全部重新获取上游数据并基于已保存的数据增量生成")
+    parser.add_argument("--username", help="登录用户名，默认使用 config.ACCOUNTS 或已保存的账号")
+    parser.add_argument("--password", help="登录密码")
+    parser.add_argument("--verbose", action="store_true", help="输出每个模板的详细进度")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "WARNING")
+    logger.add("log/GetAnswer_batch_{time}.log", rotation="1 MB", encoding="utf-8", retention="1 minute")
+    events.event_bus.subscribe(events.console_reporter,
+                               kinds=None if args.verbose else (events.WARNING, events.ERROR))
+
+    if args.input == "-":
+        codes = read_template_codes(sys.stdin)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            codes = read_template_codes(f)
+    if not codes:
+        print("没有需要处理的模板编号")
+        return 0
+
+    if args.username and args.password:
+        accounts = [{"username": args.username, "password": args.password}]
+    elif ACCOUNTS:
+        accounts = ACCOUNTS
+    else:
+        username, password = AccountManager().get_credentials()
+        if not username or not password:
+            print("未配置账号：请传入 --username/--password，或在 config.ACCOUNTS 中配置", file=sys.stderr)
+            return 2
+        accounts = [{"username": username, "password": password}]
+
+    http_session.prewarm()
+    account_pool = AccountPool(accounts)
+    if account_pool.login_all() == 0:
+        print("登录失败，请检查用户名和密码", file=sys.stderr)
+        return 2
+    if TOKEN_REFRESH_ENABLED:
+        for pooled_account in account_pool.accounts:
+            TokenRefreshScheduler(pooled_account.manager).start()
+
+    summary = run_batch(codes, account_pool, max(args.workers, 1), Checkpoint(args.checkpoint or None),
+                        args.output, args.force)
+    print_summary(summary)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
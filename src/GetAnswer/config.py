@@ -1 +1,113 @@
-BASE_URL = "https://www.xinjiaoyu.com"
\ No newline at end of file
+import os
+
+# 可通过环境变量指向本地桩服务（stub_server）进行压测
+BASE_URL = os.environ.get("XINJIAOYU_BASE_URL", "https://www.xinjiaoyu.com").rstrip("/")
+
+# HTTP 连接池配置
+HTTP_TIMEOUT = 10  # 单次请求超时（秒）
+HTTP_POOL_CONNECTIONS = 4  # 缓存的主机连接池数量
+HTTP_POOL_MAXSIZE = 16  # 每个主机保持的最大长连接数
+HTTP_POOL_BLOCK = False  # 连接池耗尽时是否阻塞等待空闲连接
+HTTP_PREWARM_CONNECTIONS = 2  # 启动时预热的连接数，0 表示不预热
+
+# 异步客户端配置
+ASYNC_HTTP2 = True  # 是否启用 HTTP/2 多路复用（需要安装 httpx[http2]）
+ASYNC_MAX_CONCURRENCY = 16  # 同时在途的最大请求数
+
+# 响应缓存配置
+RESPONSE_CACHE_MAX_ENTRIES = 512  # 内存 LRU 层最多缓存的响应数
+RESPONSE_CACHE_SQLITE_PATH = None  # 磁盘缓存数据库路径，None 表示只使用内存层
+# 按接口路径匹配的缓存时间（秒），按顺序取第一条匹配规则，未匹配的接口不缓存
+RESPONSE_CACHE_TTL_RULES = [
+    (r"/api/v3/server_questions/questions/[^/]+$", 24 * 3600),
+    (r"/homework/template/question/list$", 6 * 3600),
+    (r"/homework/point/videos/list$", 3600),
+    (r"/homework/answer/sheet/student/questions/answer$", 300),
+]
+
+# 调试记录写入配置
+DEBUG_RECORD_QUEUE_SIZE = 2000  # 待写入记录队列上限，队列满时直接丢弃
+DEBUG_RECORD_BATCH_SIZE = 200  # 单批写入的最大记录数
+DEBUG_RECORD_FLUSH_INTERVAL = 1.0  # 最长刷新间隔（秒）
+DEBUG_RECORD_MAX_SEGMENT_BYTES = 20 * 1024 * 1024  # 单个记录文件超过该大小后轮转
+DEBUG_RECORD_COMPRESS_SEGMENTS = True  # 是否 gzip 压缩已轮转的记录文件
+# 记录级别: "full" 完整记录 / "metadata" 只记录元数据 / "errors" 只记录失败请求 / "off" 关闭
+DEBUG_RECORD_LEVEL = "full"
+DEBUG_RECORD_MAX_BODY_BYTES = 256 * 1024  # 单条记录保存的响应体上限，超出部分截断
+# 按接口路径匹配的采样率（0~1），按顺序取第一条匹配规则，未匹配的接口全部记录；失败请求不受采样影响
+DEBUG_RECORD_SAMPLE_RATES = [
+    (r"/api/v3/server_questions/questions/[^/]+$", 0.2),
+]
+
+# 回放配置：设置记录文件路径后，所有上游请求改由调试记录回放，不访问真实服务
+# 录制用于回放的记录时需设置 DEBUG_RECORD_LEVEL = "full"、DEBUG_RECORD_SAMPLE_RATES = []，
+# 并把 DEBUG_RECORD_MAX_BODY_BYTES 调到大于最大的答案响应；被采样掉或截断的请求回放时会未命中（404）
+REPLAY_RECORDS_PATH = None
+REPLAY_LATENCY = "recorded"  # "recorded" 按记录耗时 / 数值为固定毫秒 / (最小, 最大) 为均匀随机毫秒 / None 不延迟
+REPLAY_SEED = 0  # 合成延迟的随机种子，保证多次回放结果一致
+
+# 监控指标配置
+METRICS_ENABLED = True
+METRICS_HOST = "0.0.0.0"
+METRICS_PORT = 8081  # /metrics 与 PyWebIO 服务（8080）并行监听
+
+# 重试与熔断配置
+RETRY_MAX_ATTEMPTS = 3  # 包含首次请求在内的最大尝试次数
+RETRY_BASE_DELAY = 0.5  # 指数退避的基础等待时间（秒）
+RETRY_MAX_DELAY = 8.0  # 单次等待上限（秒），也用于限制 Retry-After
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)  # 可重试的 HTTP 状态码
+BREAKER_FAILURE_THRESHOLD = 5  # 同一接口连续失败多少次后熔断
+BREAKER_RECOVERY_TIMEOUT = 30.0  # 熔断后多久进入半开状态放行探测请求（秒）
+
+# 上游限流配置（令牌桶：每秒补充令牌数, 桶容量）
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_GLOBAL = (20.0, 40)  # 整个进程的上游请求速率
+RATE_LIMIT_PER_ACCOUNT = (10.0, 20)  # 单个账号的请求速率，按用户数据文件区分账号（不随 Token 刷新重置）
+# 按接口路径匹配的限流规则，按顺序取第一条匹配规则
+RATE_LIMIT_ENDPOINT_RULES = [
+    (r"/api/v3/server_questions/questions/", 10.0, 20),
+    (r"/api/v3/server_system/auth/login$", 1.0, 3),
+    (r"/api/v3/server_system/system/code$", 2.0, 5),
+]
+
+# 用户数据存储配置
+CREDENTIAL_STORE_DEBOUNCE = 0.5  # 合并连续写入的延迟（秒），0 表示立即写盘
+
+# Token 主动刷新配置
+TOKEN_REFRESH_ENABLED = True
+TOKEN_REFRESH_MARGIN = 30 * 60  # 在 Token 过期前多少秒刷新
+TOKEN_REFRESH_RETRY_INTERVAL = 60  # 刷新失败后的重试间隔（秒）
+TOKEN_REFRESH_MAX_SLEEP = 10 * 60  # 单次休眠上限（秒），定期复查以感知其他途径的重新登录
+ACCOUNT_VALIDITY_TTL = 60  # 账号有效性检查结果的缓存时间（秒），与 Token 绑定，收到登录失效响应时立即作废
+RELOGIN_COOLDOWN = 10  # 一次重新登录完成后的冷却时间（秒），期间的重新登录请求直接复用上次结果
+
+# 页面生成流程配置
+PIPELINE_MAX_WORKERS = 4  # 并发执行互不依赖阶段的线程数
+PARENT_FETCH_WORKERS = 8  # 并发预取题干的线程数
+
+# 页面存储配置：页面按内容哈希分片存放，清单保存在 OUTPUT_DIR/manifest.sqlite3
+OUTPUT_DIR = "output"
+OUTPUT_MAX_AGE = None  # 页面的最长保留时间（秒），超过后视为过期重新生成，None 表示不过期
+OUTPUT_PRECOMPRESS = True  # 生成时同时写入 .gz（以及安装了 brotli 时的 .br）压缩副本，供页面服务直接发送
+
+# 页面服务配置：通过独立的 HTTP 端口直接提供生成的页面，不再经 PyWebIO 连接传输文件
+PAGE_SERVER_ENABLED = True
+PAGE_SERVER_HOST = "0.0.0.0"
+PAGE_SERVER_PORT = 8082
+PAGE_SERVER_PUBLIC_URL = None  # 页面链接使用的地址，如 "https://answers.example.com"；None 时使用访问 PyWebIO 的主机名加 PAGE_SERVER_PORT
+
+# 后台任务队列配置：页面生成在后台线程中执行，同一模板编号的并发请求共享同一个任务
+JOB_WORKERS = 4  # 同时执行的生成任务数
+
+# 批量生成配置（batch.py）
+BATCH_WORKERS = 4  # 同时处理的模板数
+BATCH_CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "batch_checkpoint.jsonl")  # 记录已处理的模板编号，中断后可续跑
+
+# 多账号配置：为空时使用 main.py 中填写的单个账号
+# 示例: {"username": "...", "password": "...", "subjects": ["数学", "物理"], "data_file": "user_data_math.json"}
+# data_file 可省略，多个账号时默认为 user_data_<用户名>.json；不同账号不能使用同一个文件
+# subjects 为该账号选修的学科，留空表示未知（参与所有学科的路由）；解析模板成功时会自动记录账号覆盖的学科
+ACCOUNTS = []
+ACCOUNT_SELECTION = "least_loaded"  # "round_robin" 轮询 / "least_loaded" 选择进行中请求最少的账号
+ACCOUNT_MAX_FAILURES = 3  # 连续失败多少次后暂时摘除账号
+ACCOUNT_FAILURE_COOLDOWN = 60  # 账号被摘除后的冷却时间（秒）
@@ -0,0 +1,124 @@
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+
+from loguru import logger
+
+from src.GetAnswer.config import CREDENTIAL_STORE_DEBOUNCE
+
+
+class CredentialStore:
+    """
+    用户数据（凭据、token、会话信息）的内存权威副本。
+
+    文件只在首次访问时读取一次，之后读操作全部走内存；写操作在锁内更新内存，
+    再经过防抖合并后以"临时文件 + 重命名"的方式原子写回，避免并发会话写坏文件。
+    """
+
+    def __init__(self, path, debounce=CREDENTIAL_STORE_DEBOUNCE):
+        self.path = path
+        self.debounce = debounce
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()  # 串行化写盘，保证后写入的数据不会被旧快照覆盖
+        self._data = None
+        self._dirty = False
+        self._timer = None
+
+    def _ensure_loaded(self):
+        if self._data is not None:
+            return
+        self._data = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self._data = json.load(file)
+        except Exception as e:
+            logger.error(f"读取用户数据文件失败: {e}")
+
+    def exists(self) -> bool:
+        """内存中是否已有数据（文件存在或已写入过）。"""
+        with self._lock:
+            self._ensure_loaded()
+            return bool(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._ensure_loaded()
+            return copy.deepcopy(self._data.get(key, default))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._ensure_loaded()
+            return copy.deepcopy(self._data)
+
+    def update(self, data: dict) -> None:
+        """合并写入若干字段，并安排一次防抖写盘。"""
+        with self._lock:
+            self._ensure_loaded()
+            self._data.update(copy.deepcopy(data))
+            self._dirty = True
+            self._schedule_flush()
+
+    def flush(self) -> None:
+        """立即把内存数据原子写回文件。"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                payload = json.dumps(self._data, ensure_ascii=False, indent=4)
+                self._dirty = False
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                fd, temp_path = tempfile.mkstemp(prefix=".user_data-", suffix=".tmp", dir=directory)
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as file:
+                        file.write(payload)
+                        file.flush()
+                        os.fsync(file.fileno())
+                    os.replace(temp_path, self.path)
+                except BaseException:
+                    os.remove(temp_path)
+                    raise
+            except Exception as e:
+                with self._lock:
+                    self._dirty = True
+                logger.error(f"写入用户数据文件失败: {e}")
+
+    def _schedule_flush(self):
+        if self.debounce <= 0:
+            self.flush()
+            return
+        if self._timer is None:
+            self._timer = threading.Timer(self.debounce, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_credential_store(path) -> CredentialStore:
+    """同一文件在进程内只对应一个存储实例。"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = CredentialStore(path)
+        return store
+
+
+@atexit.register
+def _flush_all():
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
@@ -0,0 +1,146 @@
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from loguru import logger
+
+from src.GetAnswer.config import (
+    DEBUG_RECORD_BATCH_SIZE,
+    DEBUG_RECORD_COMPRESS_SEGMENTS,
+    DEBUG_RECORD_FLUSH_INTERVAL,
+    DEBUG_RECORD_MAX_SEGMENT_BYTES,
+    DEBUG_RECORD_QUEUE_SIZE,
+)
+
+_STOP = object()
+
+
+class DebugRecordWriter:
+    """
+    后台批量写入 HTTP 调试记录。
+
+    请求线程只负责把记录放入有界队列，序列化、写盘、轮转和压缩都在后台线程完成；
+    队列已满时丢弃记录并计数，不阻塞请求。
+    """
+
+    def __init__(self, file_path, queue_size=DEBUG_RECORD_QUEUE_SIZE, batch_size=DEBUG_RECORD_BATCH_SIZE,
+                 flush_interval=DEBUG_RECORD_FLUSH_INTERVAL, max_segment_bytes=DEBUG_RECORD_MAX_SEGMENT_BYTES,
+                 compress_segments=DEBUG_RECORD_COMPRESS_SEGMENTS):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.compress_segments = compress_segments
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"submitted": 0, "written": 0, "dropped": 0, "batches": 0, "rotations": 0, "errors": 0}
+
+    def submit(self, record) -> bool:
+        """提交一条记录，返回是否成功入队。"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._increment("dropped")
+            return False
+        self._increment("submitted")
+        return True
+
+    def flush(self, timeout=5.0) -> None:
+        """等待已入队的记录全部写盘。"""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self, timeout=5.0) -> None:
+        """写完剩余记录并停止后台线程。"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("调试记录队列已满，关闭时可能丢失部分记录")
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _increment(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="debug-record-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self._write_batch(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        try:
+            lines = []
+            for record in batch:
+                lines.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            with open(self.file_path, "a", encoding="utf-8") as file:
+                file.writelines(lines)
+            self._increment("written", len(batch))
+            self._increment("batches")
+            if os.path.getsize(self.file_path) >= self.max_segment_bytes:
+                self._rotate()
+        except Exception as write_error:
+            self._increment("errors")
+            logger.error(f"保存调试记录失败: {write_error}")
+
+    def _rotate(self):
+        base, ext = os.path.splitext(self.file_path)
+        segment_path = f"{base}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{ext}"
+        os.replace(self.file_path, segment_path)
+        self._increment("rotations")
+        if not self.compress_segments:
+            return
+        try:
+            with open(segment_path, "rb") as source, gzip.open(segment_path + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(segment_path)
+        except OSError as compress_error:
+            logger.error(f"压缩调试记录文件失败: {compress_error}")
@@ -0,0 +1,136 @@
+"""
+与界面无关的进度/事件总线。
+
+抓取与渲染模块只调用 publish()，由订阅者决定如何展示：PyWebIO 会话、命令行输出或监控指标。
+订阅分两种：
+- subscribe(): 全局订阅，接收所有事件（适合日志、指标）。
+- scope(): 上下文订阅，只接收当前上下文（线程 / asyncio 任务）内发布的事件，
+  适合把某次处理的进度推送给发起它的 PyWebIO 会话。
+工作线程中发布的事件可以经 EventRelay 转交回会话线程处理（PyWebIO 的输出函数只能在会话线程中调用）。
+"""
+import contextvars
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+# 事件类型
+PROGRESS = "progress"  # data: percent
+INFO = "info"
+WARNING = "warning"
+ERROR = "error"
+TOAST = "toast"  # data: color
+
+
+@dataclass
+class Event:
+    kind: str
+    message: str
+    data: dict = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+_scoped_handlers = contextvars.ContextVar("event_handlers", default=())
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = []
+
+    def subscribe(self, handler, kinds=None):
+        """
+        全局订阅事件。
+
+        返回:
+        - callable: 调用后取消订阅。
+        """
+        entry = (handler, frozenset(kinds) if kinds else None)
+        with self._lock:
+            self._handlers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._handlers:
+                    self._handlers.remove(entry)
+
+        return unsubscribe
+
+    @contextmanager
+    def scope(self, handler, kinds=None):
+        """在 with 块（及其复制了上下文的线程/任务）内订阅事件。"""
+        token = _scoped_handlers.set(_scoped_handlers.get() + ((handler, frozenset(kinds) if kinds else None),))
+        try:
+            yield
+        finally:
+            _scoped_handlers.reset(token)
+
+    def publish(self, kind, message="", **data):
+        event = Event(kind, message, data)
+        with self._lock:
+            handlers = list(self._handlers)
+        _deliver(handlers + list(_scoped_handlers.get()), event)
+        return event
+
+
+def _deliver(handlers, event):
+    for handler, kinds in handlers:
+        if kinds is not None and event.kind not in kinds:
+            continue
+        try:
+            handler(event)
+        except Exception as error:
+            logger.error(f"事件处理失败: {event.kind} - {error}")
+
+
+class EventRelay:
+    """
+    把工作线程中发布的事件转交给创建 EventRelay 的线程。
+
+    在创建线程中实例化（记住当时的上下文订阅者），工作线程通过 run() 执行任务，
+    期间发布的事件除全局订阅者外先暂存起来，由创建线程调用 drain() 交给上下文订阅者处理。
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._handlers = _scoped_handlers.get()
+
+    def forward(self, event):
+        """暂存事件待转交，可直接作为订阅者使用（如订阅后台任务的进度）"""
+        self._queue.put(event)
+
+    def run(self, func, *args, **kwargs):
+        """在当前（工作）线程中执行 func，期间发布的事件暂存待转交"""
+        token = _scoped_handlers.set(((self.forward, None),))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _scoped_handlers.reset(token)
+
+    def drain(self) -> int:
+        """在创建线程中调用，把暂存的事件交给上下文订阅者，返回处理的事件数"""
+        count = 0
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                return count
+            _deliver(self._handlers, event)
+            count += 1
+
+
+event_bus = EventBus()
+publish = event_bus.publish
+
+
+def console_reporter(event):
+    """命令行订阅者：把事件输出到标准输出。"""
+    if event.kind == PROGRESS:
+        print(f"[{event.data.get('percent', 0):>3}%] {event.message}", flush=True)
+    elif event.kind in (WARNING, ERROR) or (event.kind == TOAST and event.data.get("color") in ("warning", "error")):
+        print(f"[!] {event.message}", flush=True)
+    else:
+        print(event.message, flush=True)
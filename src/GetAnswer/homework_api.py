@@ -0,0 +1,183 @@
+"""
+作业相关的上游接口：模板、答案与微课视频，统一经 generic_api_request 处理登录失效与重试。
+"""
+from loguru import logger
+
+from src.GetAnswer import events
+from src.GetAnswer.AccountManager import AccountManager
+from src.GetAnswer.api_client import get_content, is_login_expired
+from src.GetAnswer.config import BASE_URL
+
+
+def check_and_relogin(*managers):
+    """
+    检查用户登录状态，如果失效则尝试重新登录
+    
+    Args:
+        managers: 需要重新登录的 AccountManager，可传入多个
+
+    Returns:
+        bool: 重新登录是否成功（多个账号时只要有一个成功即为成功）
+    """
+    logger.info("检测到可能的登录失效，尝试重新登录")
+    events.publish(events.TOAST, "检测到登录状态可能已失效，正在尝试重新登录...", color='warning')
+
+    success = False
+    # 从用户数据存储中获取用户名和密码
+    try:
+        for item in managers:
+            username, password = item.get_credentials()
+            if username and password:
+                # 尝试重新登录（并发会话的重新登录会合并为一次）
+                success = item.relogin() or success
+            else:
+                logger.error("未找到保存的用户名和密码")
+                events.publish(events.TOAST, "未找到保存的用户名和密码，请重启程序并重新登录", color='error')
+        return success
+    except Exception as e:
+        logger.error(f"重新登录过程中出错: {e}")
+        events.publish(events.TOAST, "重新登录失败，请重启程序", color='error')
+        return False
+
+
+def generic_api_request(url, description, identifier=None, retry=True, expect_data=True, manager=None, refresh=False):
+    """
+    通用API请求函数，统一处理请求、错误处理和重试逻辑
+    
+    Args:
+        url: 请求URL
+        description: 请求描述（用于日志）
+        identifier: 标识符（如模板编号、模板ID等）
+        retry: 是否在失败时尝试重新登录并重试
+        expect_data: 是否期望响应中包含data字段
+        manager: 发起请求的 AccountManager，默认从用户数据文件加载
+        refresh: 是否跳过响应缓存直接请求上游（重新生成时使用）
+        
+    Returns:
+        dict or None: 响应数据或None
+    """
+    manager = manager or AccountManager()
+    try:
+        headers = manager.get_dynamic_headers()
+        token = manager.public_user_data.get("token")
+        logger.debug(f"[调试] 发送{description}请求 - 标识符: {identifier}")
+        logger.debug(f"[调试] 请求URL: {url}")
+        
+        response_data = get_content(url, headers, refresh=refresh, account=manager.account_id)
+
+        if response_data is None:
+            logger.warning(f"[调试] {description}响应数据为None - 标识符: {identifier}")
+            return None
+            
+        logger.debug(f"[调试] {description}响应: code={response_data.get('code')}, msg={response_data.get('msg')}")
+        
+        # 检查是否获取成功
+        if response_data.get('code') == 200:
+            manager.mark_valid()
+            if expect_data and not response_data.get('data'):
+                logger.warning(f"[调试] {description}成功但data字段为空 - 标识符: {identifier}")
+                return None
+            logger.info(f"[调试] 成功获取{description} - 标识符: {identifier}")
+            return response_data
+            
+        # 检查是否是登录失效
+        elif is_login_expired(response_data):
+            logger.warning(f"[调试] 检测到登录失效 - {description}, 标识符: {identifier}")
+            manager.invalidate_validity(token)
+            if retry and check_and_relogin(manager):
+                logger.info(f"重新登录成功，重试获取{description}")
+                events.publish(events.TOAST, f"重新登录成功，正在重试获取{description}...", color='info')
+                return generic_api_request(url, description, identifier, False, expect_data, manager, refresh)
+            else:
+                logger.error(f"自动重新登录失败 - {description}")
+                events.publish(events.TOAST, f"自动重新登录失败，请检查账号信息", color='error')
+                return None
+        else:
+            logger.warning(f"[调试] 获取{description}失败: 错误码 {response_data.get('code')}, 错误信息: {response_data.get('msg')} - 标识符: {identifier}")
+            return None
+            
+    except Exception as e:
+        logger.error(f"[调试] 获取{description}时发生异常 - 标识符: {identifier}")
+        logger.error(f"[调试] 异常类型: {type(e).__name__}, 异常详情: {str(e)}")
+        
+        if retry and check_and_relogin(manager):
+            logger.info(f"重新登录成功，重试获取{description}")
+            events.publish(events.TOAST, f"重新登录成功，正在重试获取{description}...", color='info')
+            return generic_api_request(url, description, identifier, False, expect_data, manager, refresh)
+        return None
+
+
+def get_video_urls(template_code, manager=None, refresh=False):
+    """
+    获取微课视频 URLs
+    
+    Args:
+        template_code: 模板编号
+        manager: 发起请求的 AccountManager
+        refresh: 是否跳过响应缓存
+        
+    Returns:
+        dict or None: 视频数据或None
+    """
+    url = f"{BASE_URL}/api/v3/server_homework/homework/point/videos/list?homeworkId=&templateCode={template_code}"
+    response_data = generic_api_request(url, "微课视频数据", template_code, retry=False, expect_data=True,
+                                        manager=manager, refresh=refresh)
+    return response_data['data'] if response_data else None
+
+
+def get_template_data(template_code, retry=True, manager=None, refresh=False):
+    """
+    获取模板数据
+    
+    Args:
+        template_code: 模板编号
+        retry: 是否在失败时尝试重新登录并重试
+        manager: 发起请求的 AccountManager（studentId 取自该账号）
+        refresh: 是否跳过响应缓存
+        
+    Returns:
+        dict or None: 模板数据或None
+    """
+    manager = manager or AccountManager()
+    url = f"{BASE_URL}/api/v3/server_homework/homework/template/question/list?templateCode={template_code}&studentId={manager.get_studentId()}&isEncrypted=false"
+    return generic_api_request(url, "模板数据", template_code, retry, expect_data=True, manager=manager,
+                               refresh=refresh)
+
+
+def get_homework_answers(template_id, retry=True, manager=None, refresh=False):
+    """
+    获取作业答案数据
+    
+    Args:
+        template_id: 模板ID
+        retry: 是否在失败时尝试重新登录并重试
+        manager: 发起请求的 AccountManager
+        refresh: 是否跳过响应缓存
+        
+    Returns:
+        dict or None: 答案数据或None
+    """
+    url = f"{BASE_URL}/api/v3/server_homework/homework/answer/sheet/student/questions/answer?templateId={template_id}"
+    return generic_api_request(url, "作业答案数据", template_id, retry, expect_data=False, manager=manager,
+                               refresh=refresh)
+
+
+def resolve_template(account_pool, template_code, refresh=False):
+    """
+    依次尝试账号池中的账号获取模板数据。
+
+    只有选修了对应学科的账号才能解析 paperID，因此按账号池给出的顺序（覆盖该学科的账号在前）逐个尝试，
+    成功后记录该账号与学科，后续同一模板优先使用它；解析失败的账号只记为未覆盖，不计入账号故障。
+
+    Returns:
+        tuple: (PooledAccount, 模板数据)，全部失败时为 (None, None)
+    """
+    for account in account_pool.candidates(template_code=template_code):
+        with account_pool.use(account) as manager:
+            response_data = get_template_data(template_code, manager=manager, refresh=refresh)
+        if response_data:
+            account_pool.report_success(account, template_code, response_data["data"].get("subjectName"))
+            return account, response_data
+        account_pool.report_miss(account, template_code)
+        logger.info(f"账号 {account.username} 未能解析模板 {template_code}，尝试下一个账号")
+    return None, None
@@ -1,11 +1,20 @@
+import contextvars
+import hashlib
+import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 from loguru import logger
-from pywebio.output import put_text
 
+from src.GetAnswer import events
 from src.GetAnswer.AccountManager import AccountManager
-from src.GetAnswer.api_client import get_content
-from src.GetAnswer.config import BASE_URL
+from src.GetAnswer.api_client import get_content, is_login_expired
+from src.GetAnswer.config import BASE_URL, PARENT_FETCH_WORKERS
+from src.GetAnswer.metrics import PARENT_STEM_FETCHES
+
+RENDERER_VERSION = "1"  # 页面结构或样式变化时递增，已生成的页面会被视为过期并重新生成
+# 保存的题目块片段中用占位符代替题目在页面中的位置（动画用的 --index），复用时替换为当前位置
+_FRAGMENT_INDEX = "\x00index\x00"
 
 
 def normalize_html_value(value):
@@ -90,8 +99,78 @@ def format_question_number(question_number):
     return f"第{question_text}题"
 
 
-def json_to_html(json_data, template_name, video_data=None):
-    account_manager = AccountManager()
+def _fetch_parent_content(parent_id, account_manager, refresh=False):
+    events.publish(events.INFO, f"🕒 开始获取题干 {parent_id} 内容...")
+    try:
+        headers = account_manager.get_dynamic_headers()
+        token = account_manager.public_user_data.get("token")
+        fetch_parent_content = get_content(
+            f"{BASE_URL}/api/v3/server_questions/questions/{parent_id}",
+            headers, refresh=refresh, account=account_manager.account_id)
+        if is_login_expired(fetch_parent_content):
+            account_manager.invalidate_validity(token)
+            PARENT_STEM_FETCHES.inc(result="error")
+            logger.warning(f"获取题干 {parent_id} 内容时登录已失效")
+            return None
+        # 请求失败或响应没有 data 时视为获取出错（None），下次增量生成会重新获取，不会被当作空题干复用
+        if not fetch_parent_content or not isinstance(fetch_parent_content.get('data'), dict):
+            PARENT_STEM_FETCHES.inc(result="error")
+            logger.warning(f"获取题干 {parent_id} 内容失败: {(fetch_parent_content or {}).get('msg', '无响应')}")
+            return None
+        parent_content = fetch_parent_content['data'].get('content') or ''
+        PARENT_STEM_FETCHES.inc(result="ok" if parent_content else "empty")
+        return parent_content
+    except Exception as fetch_error:
+        PARENT_STEM_FETCHES.inc(result="error")
+        logger.error(f"获取题干 {parent_id} 内容失败: {fetch_error}")
+        return None
+
+
+def fetch_parent_contents(json_data, account_manager, max_workers=PARENT_FETCH_WORKERS, known=None, refresh=False):
+    """
+    并发获取作业数据中所有题干的内容。
+
+    Args:
+        json_data (dict): 作业答案数据。
+        account_manager (AccountManager): 获取题干使用的账号。
+        max_workers (int): 并发请求数。
+        known (dict, optional): 可直接复用的题干内容，其中的题干不再请求。
+        refresh (bool): 是否跳过响应缓存重新获取题干。
+
+    Returns:
+        dict: 题干ID -> 题干内容；内容为空时为 ""，获取出错（含登录失效、响应无 data）时为 None。
+    """
+    known = known or {}
+    all_parent_ids = list(dict.fromkeys(
+        item["question"].get('parentId') for item in json_data.get("data") or []
+        if item.get("question") and item["question"].get('parentId') not in (None, "", "0")
+    ))
+    contents = {parent_id: known[parent_id] for parent_id in all_parent_ids if parent_id in known}
+    parent_ids = [parent_id for parent_id in all_parent_ids if parent_id not in known]
+    if not parent_ids:
+        return contents
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(parent_ids)), thread_name_prefix="parent") as executor:
+        # 每个任务复制提交时的上下文，使题干获取的事件仍能送达当前会话的订阅者
+        futures = [
+            executor.submit(contextvars.copy_context().run, _fetch_parent_content, parent_id, account_manager,
+                            refresh)
+            for parent_id in parent_ids
+        ]
+        contents.update((parent_id, future.result()) for parent_id, future in zip(parent_ids, futures))
+    return contents
+
+
+def fragment_key(items):
+    """
+    题目块 HTML 片段的缓存键，只由块内题目的数据（含 questionId）决定，与题目在列表中的位置无关，
+    前面插入或删除题目不会使后面题目块的片段失效。
+    """
+    raw = json.dumps(items, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def json_to_html(json_data, template_name, video_data=None, account_manager=None, parent_contents=None,
+                 fragments=None):
     """
     将JSON格式的作业数据转换为HTML页面。
     对内容、解析、答案都相同的连续小问进行合并显示，合并后的题目仅显示主题号。
@@ -100,6 +179,10 @@ def json_to_html(json_data, template_name, video_data=None):
         json_data (dict): 包含作业数据的字典。
         template_name (str): 作业的名称，用于HTML标题。
         video_data (list, optional): 包含视频信息的列表。 Defaults to None.
+        account_manager (AccountManager, optional): 获取题干使用的账号，默认从用户数据文件加载。
+        parent_contents (dict, optional): 预先获取的题干内容（见 fetch_parent_contents），为 None 时在此获取。
+        fragments (dict, optional): 题目块 HTML 片段缓存。传入上次生成的片段时，数据未变的题目块直接复用；
+            返回前会被替换为本次用到的全部片段，供下次增量生成使用。
 
     Returns:
         str: 生成的HTML字符串。
@@ -107,9 +190,17 @@ def json_to_html(json_data, template_name, video_data=None):
     # 校验数据是否有效
     if not json_data or "data" not in json_data or not json_data["data"]:
         logger.error(f"无效或缺失的作业数据，无法生成页面: {template_name}")
-        put_text("无效的作业数据，无法生成页面。")
+        events.publish(events.ERROR, "无效的作业数据，无法生成页面。")
         return ""
 
+    if parent_contents is None:
+        parent_contents = fetch_parent_contents(json_data, account_manager or AccountManager())
+
+    previous_fragments = {}
+    if fragments is not None:
+        previous_fragments = dict(fragments)
+        fragments.clear()
+
     # --- 页面头部与样式 ---
     html_output = """
     <html>
@@ -535,22 +626,15 @@ def json_to_html(json_data, template_name, video_data=None):
                 if current_parent_id != last_parent_id:
                     if last_parent_id:
                         html_output += "</div><hr>"
-                    put_text(f"🕒 开始获取题干 {current_parent_id} 内容...")
-                    try:
-                        fetch_parent_content = get_content(
-                            f"{BASE_URL}/api/v3/server_questions/questions/{current_parent_id}",
-                            account_manager.get_dynamic_headers())
-                        parent_content = fetch_parent_content.get('data', {}).get('content', '')
-                        if parent_content:
-                            html_output += f"<div class='parent'><p><b>题干: </b>{parent_content}</p>"
-                        else:
-                            logger.warning(f"题干 {current_parent_id} 内容为空或获取失败。")
-                            html_output += f"<div class='parent'><p><b>题干 (ID: {current_parent_id}): </b> 内容为空或获取失败</p>"
-                        last_parent_id = current_parent_id
-                    except Exception as fetch_error:
-                        logger.error(f"获取题干 {current_parent_id} 内容失败: {fetch_error}")
+                    parent_content = parent_contents.get(current_parent_id)
+                    if parent_content is None:
                         html_output += f"<div class='parent'><p><b>题干 (ID: {current_parent_id}): </b> 获取时发生错误</p>"
-                        last_parent_id = current_parent_id
+                    elif parent_content:
+                        html_output += f"<div class='parent'><p><b>题干: </b>{parent_content}</p>"
+                    else:
+                        logger.warning(f"题干 {current_parent_id} 内容为空或获取失败。")
+                        html_output += f"<div class='parent'><p><b>题干 (ID: {current_parent_id}): </b> 内容为空或获取失败</p>"
+                    last_parent_id = current_parent_id
             elif last_parent_id:
                 html_output += "</div><hr>"
                 last_parent_id = None
@@ -602,8 +686,20 @@ def json_to_html(json_data, template_name, video_data=None):
                     else:
                         break
 
+            # --- 数据未变的题目块直接复用上次生成的片段 ---
+            block_end_index = group_end_index if group_end_index > i and start_sub_num != -1 else i
+            block_start_index = i
+            block_key = fragment_key(data[i:block_end_index + 1]) if fragments is not None else None
+            cached_fragment = previous_fragments.get(block_key)
+            fragment_start = len(html_output)
+
+            if cached_fragment is not None:
+                html_output += cached_fragment.replace(_FRAGMENT_INDEX, str(i))
+                processed_indices.update(range(i, block_end_index + 1))
+                i = block_end_index + 1
+
             # --- 根据是否分组成功生成页面 ---
-            if group_end_index > i and start_sub_num != -1:
+            elif group_end_index > i and start_sub_num != -1:
                 # --- 生成合并后的题目 (仅显示主题号) ---
                 logger.info(
                     f"{display_group_number} 下的多个小问内容、解析和答案均相同，已合并显示。")
@@ -698,12 +794,16 @@ def json_to_html(json_data, template_name, video_data=None):
                 processed_indices.add(i)
                 i += 1  # 处理下一个
 
+            if block_key is not None:
+                fragments[block_key] = html_output[fragment_start:].replace(
+                    f"--index: {block_start_index};", f"--index: {_FRAGMENT_INDEX};")
+
     except IndexError:
         logger.error("处理题目数据时发生索引越界错误，可能数据不完整。")
-        put_text("处理题目数据时出错，请检查数据完整性。")
+        events.publish(events.ERROR, "处理题目数据时出错，请检查数据完整性。")
     except Exception as e:
         logger.error(f"生成HTML时发生未预料的错误: {e}", exc_info=True)
-        put_text(f"生成HTML时出错: {e}")
+        events.publish(events.ERROR, f"生成HTML时出错: {e}")
 
     # --- 页面收尾与脚本 ---
     if last_parent_id:
@@ -0,0 +1,256 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.GetAnswer.config import (
+    BASE_URL,
+    HTTP_POOL_BLOCK,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_PREWARM_CONNECTIONS,
+    HTTP_TIMEOUT,
+    REPLAY_RECORDS_PATH,
+    RETRY_STATUS_CODES,
+)
+from src.GetAnswer.metrics import endpoint_label
+from src.GetAnswer.rate_limiter import rate_limiter
+from src.GetAnswer.response_cache import normalize_url
+from src.GetAnswer.retry import default_retry_policy, get_breaker
+from src.GetAnswer.singleflight import SingleFlight
+
+# urllib3 只有在安装了 brotli / brotlicffi 时才能解码 br 压缩
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+class ConnectionStats:
+    """统计请求数与新建连接数，用于观察长连接复用情况。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests_count = self.requests
+            new_connections = self.new_connections
+        reused = max(requests_count - new_connections, 0)
+        return {
+            "requests": requests_count,
+            "new_connections": new_connections,
+            "reused_connections": reused,
+            "reuse_ratio": reused / requests_count if requests_count else 0.0,
+        }
+
+
+connection_stats = ConnectionStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_new_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_new_connection()
+        return super()._new_conn()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """在连接池新建连接时计数的 HTTPAdapter。"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+# 只合并无副作用的请求
+COALESCED_METHODS = {"GET", "HEAD"}
+request_group = SingleFlight("http")
+
+
+def _credential_key(headers):
+    """请求头中凭证的摘要，不同凭证的请求不能共享响应（只保留摘要避免在内存中多存一份凭证）"""
+    token = (headers or {}).get("accesstoken") or (headers or {}).get("authorization")
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()[:12] if token else None
+
+
+def _count_response(response, *args, **kwargs):
+    connection_stats.record_request()
+    return response
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=HTTP_POOL_BLOCK,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"})
+    # 共享会话只用于复用连接，不在请求之间携带 Cookie，保持与原先无状态请求一致
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.hooks["response"].append(_count_response)
+    if REPLAY_RECORDS_PATH:
+        _mount_replay(session, REPLAY_RECORDS_PATH)
+    return session
+
+
+def _mount_replay(session, records_path, **kwargs):
+    # 按需导入，仅在启用回放时加载
+    from src.GetAnswer.replay_transport import ReplayAdapter
+
+    adapter = ReplayAdapter(records_path, **kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    logger.info(f"已启用回放模式: {records_path}")
+    return adapter
+
+
+def get_session() -> requests.Session:
+    """获取进程级共享的 requests.Session（懒加载，线程安全）。"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def request(method, url, idempotent=None, retry_policy=None, account=None, **kwargs) -> requests.Response:
+    """
+    通过共享连接池发送请求，所有上游调用都应经由此函数。
+
+    请求按接口经过熔断器与限流器，并按重试策略对网络错误与可重试状态码进行退避重试。
+    同一规范化 URL、同一凭证的并发 GET/HEAD 请求会合并为一次上游请求，所有调用者共享同一响应；
+    凭证不同（其他账号、或重新登录前后的 Token）的请求各自发送，不会拿到别人的登录失效响应。
+
+    参数:
+    - idempotent: 是否可安全重放，None 时按 HTTP 方法判断（POST 默认不重试）。
+    - retry_policy: 重试策略，默认使用 retry.default_retry_policy。
+    - account: 限流使用的稳定账号标识（AccountManager.account_id），None 时不做按账号限流。
+    - 其余参数与 requests.request 一致，未指定 timeout 时使用 HTTP_TIMEOUT。
+
+    异常:
+    - retry.CircuitOpenError: 接口处于熔断状态（是 RequestException 的子类）。
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    # 带 params 的请求（如按 clientSessionId 获取 SafeCode）与会话绑定，不参与合并
+    if method.upper() in COALESCED_METHODS and not kwargs.get("stream") and not kwargs.get("params"):
+        return request_group.do(
+            (normalize_url(url, method), _credential_key(kwargs.get("headers"))),
+            lambda: _send(method, url, idempotent, retry_policy, account, **kwargs)
+        )
+    return _send(method, url, idempotent, retry_policy, account, **kwargs)
+
+
+def _send(method, url, idempotent, retry_policy, account, **kwargs) -> requests.Response:
+    policy = retry_policy or default_retry_policy
+    breaker = get_breaker(endpoint_label(url))
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        rate_limiter.acquire(url, account)
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except requests.exceptions.RequestException as error:
+            breaker.record_failure()
+            if not policy.should_retry(attempt, method, idempotent, error=error):
+                raise
+            delay = policy.delay_for(attempt)
+            logger.warning(f"请求异常，{delay:.2f} 秒后重试 ({attempt}/{policy.max_attempts}): {error}")
+        else:
+            if response.status_code >= 500 or response.status_code in RETRY_STATUS_CODES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if not policy.should_retry(attempt, method, idempotent, response=response):
+                return response
+            delay = policy.delay_for(attempt, response)
+            logger.warning(f"状态码 {response.status_code}，{delay:.2f} 秒后重试 ({attempt}/{policy.max_attempts})")
+        time.sleep(delay)
+
+
+def enable_replay(records_path, **kwargs):
+    """
+    让共享会话改用调试记录回放，不再访问真实服务，用于离线复现与基准测试。
+
+    参数:
+    - records_path: 调试记录文件路径（api_debug_records.jsonl）。
+    - kwargs: 传给 ReplayAdapter 的参数，如 latency、seed。
+    """
+    return _mount_replay(get_session(), records_path, **kwargs)
+
+
+def disable_replay():
+    """恢复真实网络请求。"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_connection_stats() -> dict:
+    """返回连接复用统计。"""
+    return connection_stats.snapshot()
+
+
+def prewarm(url=BASE_URL, connections=HTTP_PREWARM_CONNECTIONS) -> int:
+    """
+    启动时预先建立到上游的连接，避免首个用户请求承担 TCP+TLS 握手。
+
+    返回:
+    - int: 成功预热的连接数。
+    """
+    connections = min(connections, HTTP_POOL_MAXSIZE)
+    if connections <= 0:
+        return 0
+
+    def _warm(_):
+        try:
+            # 直接发送而不经 request()，否则并发的相同 HEAD 请求会被合并成一次，只建立一条连接
+            _send("HEAD", url, None, None, None, allow_redirects=False, timeout=5)
+            return True
+        except requests.exceptions.RequestException as error:
+            logger.warning(f"连接预热失败: {error}")
+            return False
+
+    # 并发发起，保证每个请求各自占用一条连接
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        warmed = sum(executor.map(_warm, range(connections)))
+    logger.info(f"连接预热完成: {warmed}/{connections}")
+    return warmed
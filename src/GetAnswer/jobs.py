@@ -0,0 +1,212 @@
+"""
+页面生成的后台任务队列。
+
+PyWebIO 会话只提交任务并订阅进度，生成工作由固定数量的后台线程完成：
+- 同一模板编号在排队或执行期间只有一个任务，后续请求直接并入该任务；
+  重新生成请求遇到执行中的普通任务时，在其完成后追加一次重新获取上游数据的任务；
+- 交互请求优先于后台预生成任务出队；
+- 重新生成的任务基于上次保存的原始数据增量生成，只获取和渲染变化的部分。
+"""
+import itertools
+import queue
+import threading
+import time
+
+from loguru import logger
+
+from src.GetAnswer import events
+from src.GetAnswer.config import JOB_WORKERS
+from src.GetAnswer.metrics import JOB_SUBMISSIONS, TEMPLATE_GENERATIONS, registry
+from src.GetAnswer.output_store import get_output_store
+from src.GetAnswer.pipeline import build_template_page
+
+# 优先级，数值越小越先执行
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class Job:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, template_code, priority, incremental=False):
+        self.template_code = template_code
+        self.priority = priority
+        self.incremental = incremental
+        self.status = self.QUEUED
+        self.page = None
+        self.record = None  # 写入存储后的 output_store.PageRecord
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._history = []
+        self._subscribers = []
+        self._finished = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    def subscribe(self, handler):
+        """
+        订阅任务事件，先补发已发布的事件，保证中途并入的会话也能看到完整进度。
+
+        handler 在任务线程中调用，需要渲染界面时应配合 events.EventRelay 转交回会话线程。
+
+        返回:
+        - callable: 调用后取消订阅。
+        """
+        with self._lock:
+            history = list(self._history)
+            self._subscribers.append(handler)
+        for event in history:
+            handler(event)
+
+        def unsubscribe():
+            with self._lock:
+                if handler in self._subscribers:
+                    self._subscribers.remove(handler)
+
+        return unsubscribe
+
+    def publish(self, event):
+        with self._lock:
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for handler in subscribers:
+            try:
+                handler(event)
+            except Exception as error:
+                logger.error(f"任务事件处理失败: {self.template_code} - {error}")
+
+    @property
+    def duration(self) -> float:
+        """执行耗时（秒），不含排队时间"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def wait(self, timeout=None) -> bool:
+        return self._finished.wait(timeout)
+
+    def _finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._finished.set()
+
+
+class JobQueue:
+    """按优先级调度、按模板编号去重的页面生成任务队列。"""
+
+    def __init__(self, account_pool, workers=JOB_WORKERS, store=None):
+        self.account_pool = account_pool
+        self.workers = workers
+        self.store = store or get_output_store()
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._active = {}  # 模板编号 -> 排队或执行中的任务
+        self._followups = {}  # 模板编号 -> 等执行中的普通任务完成后再入队的重新生成任务
+        self._threads = []
+        self._stats = {"submitted": 0, "attached": 0, "done": 0, "failed": 0}
+        registry.gauge_callback(
+            "getanswer_job_queue", "后台任务队列统计",
+            lambda: {(key,): value for key, value in self.stats().items()}, ("kind",))
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, template_code, priority=INTERACTIVE, incremental=False) -> Job:
+        """
+        提交生成任务；同一模板编号已有排队或执行中的任务时直接返回该任务。
+
+        并入排队中的任务时若优先级更高，会提升该任务的优先级。
+        incremental 为 True 时基于页面存储中上次的原始数据增量生成（用于重新生成已有页面），
+        并跳过响应缓存重新获取上游数据；并入排队中的普通任务时该任务也改为重新获取。
+        同一模板的普通任务已在执行时，它会用到缓存的数据，因此返回一个在其完成后才入队的重新生成任务。
+        """
+        with self._lock:
+            job = self._active.get(template_code)
+            if job is not None and incremental and job.status == Job.RUNNING and not job.incremental:
+                followup = self._followups.get(template_code)
+                if followup is not None:
+                    self._stats["attached"] += 1
+                    JOB_SUBMISSIONS.inc(kind="attached")
+                    followup.priority = min(followup.priority, priority)
+                    return followup
+                followup = self._followups[template_code] = Job(template_code, priority, incremental=True)
+                self._stats["submitted"] += 1
+                JOB_SUBMISSIONS.inc(kind="followup")
+                return followup
+            if job is not None:
+                self._stats["attached"] += 1
+                JOB_SUBMISSIONS.inc(kind="attached")
+                if job.status == Job.QUEUED and incremental:
+                    job.incremental = True
+                if job.status == Job.QUEUED and priority < job.priority:
+                    job.priority = priority
+                    self._queue.put((priority, next(self._sequence), job))
+                return job
+            job = self._active[template_code] = Job(template_code, priority, incremental)
+            self._stats["submitted"] += 1
+            JOB_SUBMISSIONS.inc(kind="new")
+            self._queue.put((priority, next(self._sequence), job))
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queued"] = sum(1 for job in self._active.values() if job.status == Job.QUEUED) + len(self._followups)
+            stats["running"] = sum(1 for job in self._active.values() if job.status == Job.RUNNING)
+        return stats
+
+    def _run(self):
+        while True:
+            priority, _, job = self._queue.get()
+            with self._lock:
+                # 提升优先级时会重复入队，跳过过期的条目
+                if job.status != Job.QUEUED or priority != job.priority:
+                    continue
+                job.status = Job.RUNNING
+                job.started_at = time.time()
+            status, error = self._execute(job)
+            with self._lock:
+                # 先移出活动任务再标记完成，之后的提交会新建任务而不是并入已结束的任务
+                self._active.pop(job.template_code, None)
+                self._stats[status] += 1
+                followup = self._followups.pop(job.template_code, None)
+                if followup is not None:
+                    self._active[job.template_code] = followup
+                    self._queue.put((followup.priority, next(self._sequence), followup))
+            job._finish(status, error)
+
+    def _execute(self, job):
+        try:
+            with events.event_bus.scope(job.publish):
+                previous = self.store.get_sources(job.template_code) if job.incremental else None
+                page = build_template_page(job.template_code, self.account_pool, previous,
+                                           refresh=job.incremental)
+                # 答案数据无效时渲染结果为空，同样按失败处理，不写入存储
+                if not page or not page.html:
+                    logger.warning("未获取到有效数据")
+                    events.publish(events.TOAST, "获取模板数据失败", color='error')
+                    TEMPLATE_GENERATIONS.inc(result="failure")
+                    return Job.FAILED, None
+                events.publish(events.PROGRESS, '正在保存文件...', percent=90)
+                job.page = page
+                job.record = self.store.put(page)
+                TEMPLATE_GENERATIONS.inc(result="success")
+            return Job.DONE, None
+        except Exception as error:
+            logger.error(f"生成任务 {job.template_code} 执行出错: {error}")
+            TEMPLATE_GENERATIONS.inc(result="error")
+            return Job.FAILED, error
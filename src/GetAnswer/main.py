@@ -10,177 +10,76 @@ if root_dir not in sys.path:
 from loguru import logger
 from pywebio import start_server, session
 from pywebio.input import input
-from pywebio.output import put_text, clear, put_file, put_buttons, toast, put_processbar, set_processbar
-
-from src.GetAnswer.AccountManager import AccountManager
-from src.GetAnswer.api_client import get_content
-from src.GetAnswer.config import BASE_URL
-from src.GetAnswer.html_generator import json_to_html
+from pywebio.output import put_text, clear, put_file, put_buttons, put_link, toast, put_processbar, set_processbar
+
+from src.GetAnswer import events, http_session
+from src.GetAnswer.account_pool import AccountPool
+from src.GetAnswer.config import (
+    ACCOUNTS,
+    METRICS_ENABLED,
+    METRICS_HOST,
+    METRICS_PORT,
+    PAGE_SERVER_ENABLED,
+    PAGE_SERVER_HOST,
+    PAGE_SERVER_PORT,
+    PAGE_SERVER_PUBLIC_URL,
+    TOKEN_REFRESH_ENABLED,
+)
+from src.GetAnswer.homework_api import check_and_relogin
+from src.GetAnswer.jobs import JobQueue
+from src.GetAnswer.metrics import OUTPUT_CACHE_HITS, start_metrics_server
+from src.GetAnswer.output_store import get_output_store
+from src.GetAnswer.page_server import page_path, start_page_server
+from src.GetAnswer.pipeline import normalize_template_code
+from src.GetAnswer.token_refresher import TokenRefreshScheduler
 
 
 def update_progress(progress, message):
-    """更新进度条和状态信息"""
-    set_processbar('bar', progress / 100)
-    put_text(f'🕒 {message}')
-
-
-def check_and_relogin():
-    """
-    检查用户登录状态，如果失效则尝试重新登录
-    
-    Returns:
-        bool: 重新登录是否成功
-    """
-    logger.info("检测到可能的登录失效，尝试重新登录")
-    toast("检测到登录状态可能已失效，正在尝试重新登录...", color='warning')
-
-    # 从用户数据文件中获取用户名和密码
-    try:
-        import json
-        if os.path.exists(account_manager.DATA_FILE):
-            with open(account_manager.DATA_FILE, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                username = data.get("username", "")
-                password = data.get("password", "")
-
-                if username and password:
-                    # 尝试重新登录
-                    return account_manager.login(username, password)
-                else:
-                    logger.error("未找到保存的用户名和密码")
-                    toast("未找到保存的用户名和密码，请重启程序并重新登录", color='error')
-                    return False
-        else:
-            logger.error("未找到用户数据文件")
-            toast("未找到用户数据文件，请重启程序并重新登录", color='error')
-            return False
-    except Exception as e:
-        logger.error(f"重新登录过程中出错: {e}")
-        toast("重新登录失败，请重启程序", color='error')
-        return False
-
-
-def generic_api_request(url, description, identifier=None, retry=True, expect_data=True):
-    """
-    通用API请求函数，统一处理请求、错误处理和重试逻辑
-    
-    Args:
-        url: 请求URL
-        description: 请求描述（用于日志）
-        identifier: 标识符（如模板编号、模板ID等）
-        retry: 是否在失败时尝试重新登录并重试
-        expect_data: 是否期望响应中包含data字段
-        
-    Returns:
-        dict or None: 响应数据或None
-    """
-    try:
-        headers = account_manager.get_dynamic_headers()
-        logger.debug(f"[调试] 发送{description}请求 - 标识符: {identifier}")
-        logger.debug(f"[调试] 请求URL: {url}")
-        
-        response_data = get_content(url, headers)
-        
-        if response_data is None:
-            logger.warning(f"[调试] {description}响应数据为None - 标识符: {identifier}")
-            return None
-            
-        logger.debug(f"[调试] {description}响应: code={response_data.get('code')}, msg={response_data.get('msg')}")
-        
-        # 检查是否获取成功
-        if response_data.get('code') == 200:
-            if expect_data and not response_data.get('data'):
-                logger.warning(f"[调试] {description}成功但data字段为空 - 标识符: {identifier}")
-                return None
-            logger.info(f"[调试] 成功获取{description} - 标识符: {identifier}")
-            return response_data
-            
-        # 检查是否是登录失效
-        elif (response_data.get('code') in (410, 416) or 
-              (isinstance(response_data.get('msg'), str) and 
-               ('请先登录' in response_data.get('msg') or '请重新登录' in response_data.get('msg')))):
-            logger.warning(f"[调试] 检测到登录失效 - {description}, 标识符: {identifier}")
-            if retry and check_and_relogin():
-                logger.info(f"重新登录成功，重试获取{description}")
-                toast(f"重新登录成功，正在重试获取{description}...", color='info')
-                return generic_api_request(url, description, identifier, False, expect_data)
-            else:
-                logger.error(f"自动重新登录失败 - {description}")
-                toast(f"自动重新登录失败，请检查账号信息", color='error')
-                return None
-        else:
-            logger.warning(f"[调试] 获取{description}失败: 错误码 {response_data.get('code')}, 错误信息: {response_data.get('msg')} - 标识符: {identifier}")
-            return None
-            
-    except Exception as e:
-        logger.error(f"[调试] 获取{description}时发生异常 - 标识符: {identifier}")
-        logger.error(f"[调试] 异常类型: {type(e).__name__}, 异常详情: {str(e)}")
-        
-        if retry and check_and_relogin():
-            logger.info(f"重新登录成功，重试获取{description}")
-            toast(f"重新登录成功，正在重试获取{description}...", color='info')
-            return generic_api_request(url, description, identifier, False, expect_data)
-        return None
-
-
-def get_video_urls(template_code):
-    """
-    获取微课视频 URLs
-    
-    Args:
-        template_code: 模板编号
-        
-    Returns:
-        dict or None: 视频数据或None
-    """
-    url = f"{BASE_URL}/api/v3/server_homework/homework/point/videos/list?homeworkId=&templateCode={template_code}"
-    response_data = generic_api_request(url, "微课视频数据", template_code, retry=False, expect_data=True)
-    return response_data['data'] if response_data else None
-
-
-def get_template_data(template_code, retry=True):
-    """
-    获取模板数据
-    
-    Args:
-        template_code: 模板编号
-        retry: 是否在失败时尝试重新登录并重试
-        
-    Returns:
-        dict or None: 模板数据或None
-    """
-    url = f"{BASE_URL}/api/v3/server_homework/homework/template/question/list?templateCode={template_code}&studentId={account_manager.get_studentId()}&isEncrypted=false"
-    return generic_api_request(url, "模板数据", template_code, retry, expect_data=True)
-
-
-def get_homework_answers(template_id, retry=True):
-    """
-    获取作业答案数据
-    
-    Args:
-        template_id: 模板ID
-        retry: 是否在失败时尝试重新登录并重试
-        
-    Returns:
-        dict or None: 答案数据或None
-    """
-    url = f"{BASE_URL}/api/v3/server_homework/homework/answer/sheet/student/questions/answer?templateId={template_id}"
-    return generic_api_request(url, "作业答案数据", template_id, retry, expect_data=False)
+    """发布进度事件，由订阅者更新进度条和状态信息"""
+    events.publish(events.PROGRESS, message, percent=progress)
+
+
+def render_event(event):
+    """PyWebIO 会话中的事件订阅者，把进度与提示渲染到当前页面"""
+    if event.kind == events.PROGRESS:
+        set_processbar('bar', event.data.get('percent', 0) / 100)
+        put_text(f'🕒 {event.message}')
+    elif event.kind == events.TOAST:
+        toast(event.message, color=event.data.get('color', 'info'))
+    else:
+        put_text(event.message)
+
+
+def with_session_events(func):
+    """按钮回调运行在 PyWebIO 的回调线程中，需要重新订阅本会话的事件"""
+    def wrapper():
+        with events.event_bus.scope(render_event):
+            return func()
+    return wrapper
+
+
+def put_page_download(record):
+    """展示生成页面的链接，由页面服务直接发送文件；未启用页面服务时经 PyWebIO 传输文件"""
+    if not PAGE_SERVER_ENABLED:
+        with open(record.path, "rb") as f:
+            put_file(record.download_name, f.read(), "点击下载生成后的文件")
+        return
+    base_url = PAGE_SERVER_PUBLIC_URL or f"http://{session.info.server_host.rsplit(':', 1)[0]}:{PAGE_SERVER_PORT}"
+    put_link('在线查看', base_url + page_path(record.template_code), new_window=True)
+    put_link('点击下载生成后的文件', base_url + page_path(record.template_code, download=True), new_window=True)
 
 
 def process_template(template_code, force_regenerate=False):
-    output_folder = "output"
-    os.makedirs(output_folder, exist_ok=True)
-    template_file = os.path.join(output_folder, f"output-{template_code}.html")
+    record = get_output_store().get_fresh(template_code)
 
-    if os.path.exists(template_file) and not force_regenerate:
+    if record and not force_regenerate:
+        OUTPUT_CACHE_HITS.inc()
         toast('页面已经生成过', color='error')
-        with open(template_file, "rb") as f:
-            put_file(template_file, f.read(), "点击下载生成后的文件")
+        put_page_download(record)
         put_buttons(
             ['重新生成并覆盖', '重新查询'],
             onclick=[
-                lambda: clear() or process_template(template_code, True),
+                with_session_events(lambda: clear() or process_template(template_code, True)),
                 lambda: clear() or main()
             ]
         )
@@ -194,45 +93,37 @@ def process_template(template_code, force_regenerate=False):
     put_processbar('bar')
     update_progress(5, '开始处理请求...')
 
-    update_progress(10, '正在获取微课视频信息...')
-    video_data = get_video_urls(template_code)
-    if video_data:
-        logger.info(f"存在微课视频数据")
-        toast("已获取到微课视频信息", color='info')
-
-    update_progress(15, '正在获取模板基本信息...')
-    response_data = get_template_data(template_code)
-
-    if not response_data:
-        logger.warning("未获取到有效数据")
-        toast("获取模板数据失败", color='error')
+    # 生成工作交给后台任务队列，会话只订阅进度；同一模板的并发请求共享同一个任务
+    job = job_queue.submit(template_code, incremental=force_regenerate)
+    relay = events.EventRelay()
+    unsubscribe = job.subscribe(relay.forward)
+    try:
+        while not job.wait(0.1):
+            relay.drain()
+    finally:
+        unsubscribe()
+        relay.drain()
+
+    if job.error is not None:
+        raise job.error
+    if job.status != job.DONE:
         return
 
-    update_progress(35, '正在解析模板信息...')
-    template_id = response_data["data"]["templateId"]
-    template_name = response_data["data"]["templateName"].replace('　', ' ')
-    toast(f"开始处理：{template_name}", color='info')
-
-    update_progress(55, '正在获取作业答案数据...')
-    homework_response = get_homework_answers(template_id)
-
-    update_progress(75, '正在生成HTML内容...')
-    html_result = json_to_html(homework_response, template_name, video_data)
-
-    update_progress(90, '正在保存文件...')
-    with open(template_file, "w", encoding="utf-8") as f:
-        f.write(html_result)
-
     update_progress(100, '处理完成！')
-    toast('🎉 HTML文件已成功生成！', color='success')
-    with open(template_file, "rb") as f:
-        put_file(template_file, f.read(), "点击下载生成后的文件")
+    events.publish(events.TOAST, '🎉 HTML文件已成功生成！', color='success')
+    put_page_download(job.record)
     put_buttons(['再次查询'], onclick=[lambda: clear() or main()])
 
 
 def main():
     session.run_js('document.title="Get Answer Application | LaoShui"')  # 设置浏览器标题
 
+    # 只接收本会话内发布的事件，避免把其他会话的进度推送到当前页面
+    with events.event_bus.scope(render_event):
+        run_session_loop()
+
+
+def run_session_loop():
     while True:
         template_code = input("请输入作业模板编号：").strip()
 
@@ -242,7 +133,7 @@ def main():
             continue  # 重新提示输入
 
         # 去掉最后的&及其后面的部分（适用于自助题卡 获取答案时不需要此参数）
-        template_code = template_code.split('&')[0]
+        template_code = normalize_template_code(template_code)
 
         try:
             process_template(template_code)
@@ -254,7 +145,7 @@ def main():
             # 尝试检查是否是登录失效导致的错误
             if "认证" in str(e) or "登录" in str(e) or "token" in str(e).lower() or "授权" in str(e):
                 logger.info("可能是登录状态失效导致的错误，尝试重新登录")
-                if check_and_relogin():
+                if check_and_relogin(*(account.manager for account in account_pool.accounts)):
                     logger.info("重新登录成功，重试当前操作")
                     toast("重新登录成功，正在重试...", color='info')
                     # 不清除界面，继续尝试当前操作
@@ -267,18 +158,27 @@ def main():
 
 if __name__ == '__main__':
     logger.add("log/GetAnswer_main_{time}.log", rotation="1 MB", encoding="utf-8", retention="1 minute")
-    account_manager = AccountManager()
+    http_session.prewarm()  # 预先建立到上游的长连接
 
-    # 在这里填写你的用户名和密码
+    # 在这里填写你的用户名和密码（config.ACCOUNTS 配置了多个账号时以其为准）
     username = "username"
     password = "password"
+    account_pool = AccountPool(ACCOUNTS or [{"username": username, "password": password}])
 
     # 登录并检查结果
-    login_success = account_manager.login(username, password)
+    login_success = account_pool.login_all() > 0
     if not login_success:
         logger.error("初始登录失败，请检查用户名和密码")
         import sys
 
         sys.exit(1)
 
+    if TOKEN_REFRESH_ENABLED:
+        for pooled_account in account_pool.accounts:
+            TokenRefreshScheduler(pooled_account.manager).start()
+    job_queue = JobQueue(account_pool).start()
+    if METRICS_ENABLED:
+        start_metrics_server(METRICS_HOST, METRICS_PORT)
+    if PAGE_SERVER_ENABLED:
+        start_page_server(PAGE_SERVER_HOST, PAGE_SERVER_PORT, job_queue.store)
     start_server(main, port=8080, debug=True)
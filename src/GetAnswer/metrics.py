@@ -0,0 +1,243 @@
+"""
+进程内的 Prometheus 风格指标：计数器、直方图与回调型仪表，通过 /metrics 以文本格式暴露。
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_ID_SEGMENT = re.compile(r"/(?=[^/]*\d)[^/]{6,}(?=/|$)")
+
+
+def endpoint_label(url):
+    """把 URL 路径中的 ID 片段替换为 {id}，避免标签基数随数据增长。"""
+    return _ID_SEGMENT.sub("/{id}", urlsplit(url).path)
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.label_names}，实际为 {tuple(labels)}")
+        return tuple(labels[name] for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.extend(self._render_sample(label_values, value))
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_sample(self, label_values, value):
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {value}"]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            index = bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """以秒为单位记录代码块耗时。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_sample(self, label_values, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bucket, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, label_values, ("le", bucket))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, label_values, ("le", "+Inf"))
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        plain_labels = _format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{plain_labels} {total}")
+        lines.append(f"{self.name}_count{plain_labels} {count}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """在抓取时调用回调取值的仪表，回调返回 {标签值元组: 数值}。"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, callback, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def render(self):
+        try:
+            with self._lock:
+                self._values = dict(self.callback())
+        except Exception as error:
+            logger.error(f"采集指标 {self.name} 失败: {error}")
+            self._values = {}
+        return super().render()
+
+    def _render_sample(self, label_values, value):
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {value}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge_callback(self, name, documentation, callback, label_names=()):
+        return self.register(CallbackGauge(name, documentation, callback, label_names))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+UPSTREAM_LATENCY = registry.histogram(
+    "getanswer_upstream_request_seconds", "上游 GET 请求耗时（经 api_client.get_content，不含响应缓存命中）", ("endpoint", "outcome"))
+RELOGINS = registry.counter("getanswer_relogins_total", "重新登录次数（still_valid 为会话仍有效而未登录，cooldown 为冷却期内复用结果的次数，合并的并发调用计入 coalesced_requests）", ("result",))
+TOKEN_REFRESHES = registry.counter("getanswer_token_refreshes_total", "后台主动刷新 Token 的次数", ("result",))
+PARENT_STEM_FETCHES = registry.counter("getanswer_parent_stem_fetches_total", "获取题干内容的次数", ("result",))
+TEMPLATE_GENERATIONS = registry.counter("getanswer_template_generations_total", "生成答案页面的次数", ("result",))
+OUTPUT_CACHE_HITS = registry.counter("getanswer_output_cache_hits_total", "process_template 直接复用已生成页面的次数")
+RENDER_SECONDS = registry.histogram("getanswer_render_seconds", "json_to_html 渲染耗时")
+JOB_SUBMISSIONS = registry.counter(
+    "getanswer_job_submissions_total", "提交到后台任务队列的请求数（attached 为并入进行中任务的次数，followup 为等执行中的任务完成后追加的重新生成任务）", ("kind",))
+PIPELINE_STAGE_SECONDS = registry.histogram(
+    "getanswer_pipeline_stage_seconds", "页面生成流程各阶段耗时", ("stage",))
+RATE_LIMIT_WAIT = registry.histogram(
+    "getanswer_rate_limit_wait_seconds", "请求在上游限流器中的排队时间", ("endpoint",),
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+COALESCED_REQUESTS = registry.counter(
+    "getanswer_coalesced_requests_total", "与进行中的相同请求合并、未单独发送的调用次数", ("group",))
+EVENTS_PUBLISHED = registry.counter("getanswer_events_total", "事件总线上发布的事件数", ("kind",))
+BYTES_WRITTEN = registry.counter("getanswer_output_bytes_written_total", "写入 output 目录的字节数")
+
+
+def _register_component_gauges():
+    # 放在函数内导入，避免 metrics 被底层模块引用时产生循环导入
+    from src.GetAnswer.events import event_bus
+    from src.GetAnswer.api_client import debug_record_writer
+    from src.GetAnswer.http_session import get_connection_stats, request_group
+    from src.GetAnswer.rate_limiter import rate_limiter
+    from src.GetAnswer.response_cache import response_cache
+    from src.GetAnswer.retry import CircuitBreaker, get_breaker_states
+
+    event_bus.subscribe(lambda event: EVENTS_PUBLISHED.inc(kind=event.kind))
+    breaker_state_values = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+    registry.gauge_callback(
+        "getanswer_http_connections", "共享连接池的请求数与新建连接数",
+        lambda: {(key,): value for key, value in get_connection_stats().items()}, ("kind",))
+    registry.gauge_callback(
+        "getanswer_response_cache", "响应缓存统计",
+        lambda: {(key,): value for key, value in response_cache.stats().items()}, ("kind",))
+    registry.gauge_callback(
+        "getanswer_debug_records", "调试记录写入统计",
+        lambda: {(key,): value for key, value in debug_record_writer.stats().items()}, ("kind",))
+    registry.gauge_callback(
+        "getanswer_request_coalescing", "请求合并统计",
+        lambda: {(key,): value for key, value in request_group.stats().items()}, ("kind",))
+    registry.gauge_callback(
+        "getanswer_rate_limiter", "上游限流统计",
+        lambda: {(key,): value for key, value in rate_limiter.stats().items()}, ("kind",))
+    registry.gauge_callback(
+        "getanswer_circuit_breaker_state", "接口熔断状态（0 关闭 / 1 半开 / 2 打开）",
+        lambda: {(endpoint,): breaker_state_values[state["state"]]
+                 for endpoint, state in get_breaker_states().items()}, ("endpoint",))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        content = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host, port):
+    """在后台线程启动 /metrics 服务，返回服务实例。"""
+    _register_component_gauges()
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"监控指标服务已启动: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,225 @@
+"""
+生成页面的索引存储。
+
+页面文件按内容哈希分片存放（pages/ab/cd/<sha256>.html），SQLite 清单按模板编号记录
+templateId、名称、生成时间、渲染器版本、内容哈希与大小。查找、列表与过期判断都走主键或索引，
+不依赖扫描目录，页面数量达到数万时仍保持常数级开销。
+同时保存上次生成时的原始数据（答案、题干、微课视频与 HTML 片段），供增量重新生成使用。
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+from loguru import logger
+
+from src.GetAnswer.config import OUTPUT_DIR, OUTPUT_MAX_AGE, OUTPUT_PRECOMPRESS
+from src.GetAnswer.html_generator import RENDERER_VERSION
+from src.GetAnswer.metrics import BYTES_WRITTEN
+from src.GetAnswer.payloads import loads
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 预压缩副本的扩展名与压缩函数，按优先级排列
+PRECOMPRESSED_ENCODINGS = [("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+if brotli is not None:
+    PRECOMPRESSED_ENCODINGS.insert(0, ("br", ".br", lambda data: brotli.compress(data, mode=brotli.MODE_TEXT)))
+
+
+@dataclass(frozen=True)
+class PageRecord:
+    template_code: str
+    template_id: str
+    template_name: str
+    generated_at: float
+    renderer_version: str
+    content_hash: str
+    size: int
+    path: str  # 页面文件的绝对路径
+
+    @property
+    def download_name(self) -> str:
+        """下载时使用的文件名，与原先 output 目录中的文件名保持一致"""
+        return f"output-{self.template_code}.html"
+
+
+_COLUMNS = "template_code, template_id, template_name, generated_at, renderer_version, content_hash, size"
+
+
+class OutputStore:
+    def __init__(self, root=OUTPUT_DIR, manifest_path=None, max_age=OUTPUT_MAX_AGE, precompress=OUTPUT_PRECOMPRESS):
+        self.root = os.path.abspath(root)
+        self.pages_dir = os.path.join(self.root, "pages")
+        self.max_age = max_age
+        self.precompress = precompress
+        self._lock = threading.Lock()
+        os.makedirs(self.pages_dir, exist_ok=True)
+        self._db = sqlite3.connect(manifest_path or os.path.join(self.root, "manifest.sqlite3"),
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "template_code TEXT PRIMARY KEY, template_id TEXT NOT NULL, template_name TEXT NOT NULL, "
+            "generated_at REAL NOT NULL, renderer_version TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "size INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_generated_at ON pages (generated_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "template_code TEXT PRIMARY KEY, renderer_version TEXT NOT NULL, payload BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def content_path(self, content_hash) -> str:
+        return os.path.join(self.pages_dir, content_hash[:2], content_hash[2:4], f"{content_hash}.html")
+
+    def _to_record(self, row) -> PageRecord:
+        return PageRecord(*row, path=self.content_path(row[5]))
+
+    def get(self, template_code) -> Optional[PageRecord]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM pages WHERE template_code = ?",
+                                   (template_code,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def is_stale(self, record: Optional[PageRecord]) -> bool:
+        """记录不存在、渲染器版本变化、超过 max_age 或文件丢失时视为过期"""
+        if record is None or record.renderer_version != RENDERER_VERSION:
+            return True
+        if self.max_age is not None and time.time() - record.generated_at > self.max_age:
+            return True
+        return not os.path.exists(record.path)
+
+    def get_fresh(self, template_code) -> Optional[PageRecord]:
+        record = self.get(template_code)
+        return None if self.is_stale(record) else record
+
+    def put(self, page) -> PageRecord:
+        """
+        写入页面（pipeline.TemplatePage）并更新清单；内容相同的页面共享同一个文件。
+
+        页面带有 sources（生成时的原始数据）时一并保存，供 get_sources 增量重新生成使用。
+        """
+        content = page.html.encode("utf-8")
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self.content_path(content_hash)
+        record = PageRecord(page.template_code, page.template_id, page.template_name, time.time(),
+                            RENDERER_VERSION, content_hash, len(content), path)
+        # 文件写入与清单更新在同一把锁内，避免刚写入的文件被其他线程当作无引用文件删除
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.precompress:
+                    # 压缩副本先于原文件写入，原文件存在即表示副本齐全
+                    for _, suffix, compress in PRECOMPRESSED_ENCODINGS:
+                        self._write_atomic(path + suffix, compress(content))
+                self._write_atomic(path, content)
+            previous = self._db.execute("SELECT content_hash FROM pages WHERE template_code = ?",
+                                        (page.template_code,)).fetchone()
+            self._db.execute(
+                f"INSERT OR REPLACE INTO pages ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (record.template_code, record.template_id, record.template_name, record.generated_at,
+                 record.renderer_version, record.content_hash, record.size)
+            )
+            if getattr(page, "sources", None):
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sources (template_code, renderer_version, payload) VALUES (?, ?, ?)",
+                    (page.template_code, RENDERER_VERSION, zlib.compress(json.dumps(page.sources, ensure_ascii=False).encode("utf-8")))
+                )
+            self._db.commit()
+            if previous and previous[0] != content_hash:
+                self._remove_unreferenced(previous[0])
+        return record
+
+    def get_sources(self, template_code) -> Optional[dict]:
+        """
+        返回上次生成时保存的原始数据；渲染器版本变化时丢弃其中的 HTML 片段，只保留上游数据。
+        """
+        with self._lock:
+            row = self._db.execute("SELECT renderer_version, payload FROM sources WHERE template_code = ?",
+                                   (template_code,)).fetchone()
+        if not row:
+            return None
+        try:
+            sources = loads(zlib.decompress(row[1]))
+        except (zlib.error, ValueError) as error:
+            logger.warning(f"读取模板 {template_code} 的原始数据失败: {error}")
+            return None
+        if row[0] != RENDERER_VERSION:
+            sources["fragments"] = {}
+        return sources
+
+    def delete(self, template_code) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT content_hash FROM pages WHERE template_code = ?",
+                                   (template_code,)).fetchone()
+            if not row:
+                return False
+            self._db.execute("DELETE FROM pages WHERE template_code = ?", (template_code,))
+            self._db.execute("DELETE FROM sources WHERE template_code = ?", (template_code,))
+            self._db.commit()
+            self._remove_unreferenced(row[0])
+        return True
+
+    def list(self, limit=100, offset=0) -> list:
+        """按生成时间倒序列出页面"""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM pages ORDER BY generated_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total_size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"pages": count, "bytes": total_size}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _write_atomic(path, data):
+        # 先写临时文件再原子替换，读取方不会看到写了一半的页面
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        BYTES_WRITTEN.inc(len(data))
+
+    def _remove_unreferenced(self, content_hash):
+        # 调用方已持有 self._lock
+        if self._db.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return
+        path = self.content_path(content_hash)
+        for file_path in [path] + [path + suffix for _, suffix, _ in PRECOMPRESSED_ENCODINGS]:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as error:
+                logger.warning(f"删除旧页面文件失败: {error}")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_output_store(root=OUTPUT_DIR) -> OutputStore:
+    """按输出目录返回进程内共享的 OutputStore"""
+    root = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = OutputStore(root)
+        return store
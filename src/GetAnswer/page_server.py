@@ -0,0 +1,167 @@
+"""
+生成页面的静态 HTTP 服务。
+
+GET/HEAD /pages/<模板编号>.html 直接从页面存储发送文件：
+- 按 Accept-Encoding 选择生成时写好的 .br / .gz 副本，不在请求时压缩；
+- 使用 socket.sendfile（支持时即 os.sendfile）发送，内存占用与文件大小无关；
+- ETag 取自内容哈希，Last-Modified 取自生成时间，支持条件请求与单段 Range。
+加上 ?download=1 时以附件形式下载。
+"""
+import email.utils
+import os
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from loguru import logger
+
+from src.GetAnswer.output_store import PRECOMPRESSED_ENCODINGS, get_output_store
+
+_PAGE_PATH = re.compile(r"^/pages/([^/]+)\.html$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def page_path(template_code, download=False) -> str:
+    """页面在服务中的路径"""
+    return f"/pages/{quote(template_code, safe='')}.html" + ("?download=1" if download else "")
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header, size):
+    """
+    解析单段 Range 请求头。
+
+    返回:
+    - (start, end): 闭区间；请求头缺失或格式不支持（如多段）时返回 None，按完整内容处理。
+    - ValueError: 范围无法满足。
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("空范围")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("范围超出文件大小")
+    return start, end
+
+
+class PageRequestHandler(BaseHTTPRequestHandler):
+    server_version = "GetAnswerPages/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"[页面服务] {self.address_string()} {format % args}")
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        parsed_url = urlsplit(self.path)
+        match = _PAGE_PATH.match(parsed_url.path)
+        record = self.server.store.get(unquote(match.group(1))) if match else None
+        if record is None or not os.path.exists(record.path):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        # 有 Range 时发送原文件，偏移量针对未压缩的内容
+        range_header = self.headers.get("Range")
+        encoding, suffix = None, ""
+        if not range_header:
+            accepted = _accepted_encodings(self.headers.get("Accept-Encoding"))
+            for name, candidate_suffix, _ in PRECOMPRESSED_ENCODINGS:
+                if name in accepted and os.path.exists(record.path + candidate_suffix):
+                    encoding, suffix = name, candidate_suffix
+                    break
+
+        etag = f'"{record.content_hash}{"-" + encoding if encoding else ""}"'
+        last_modified = email.utils.formatdate(record.generated_at, usegmt=True)
+        if self._not_modified(etag, record.generated_at):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_common_headers(etag, last_modified, encoding)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        file_path = record.path + suffix
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            byte_range = None
+            if range_header and self.headers.get("If-Range", etag) in (etag, last_modified):
+                try:
+                    byte_range = parse_range(range_header, size)
+                except ValueError:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+            start, end = byte_range or (0, size - 1)
+            length = max(end - start + 1, 0)
+            self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+            self._send_common_headers(etag, last_modified, encoding)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(length))
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            if parse_qs(parsed_url.query).get("download"):
+                self.send_header("Content-Disposition",
+                                 f"attachment; filename*=UTF-8''{quote(record.download_name)}")
+            self.end_headers()
+            if send_body and length:
+                self.wfile.flush()
+                self.connection.sendfile(f, start, length)
+
+    def _send_common_headers(self, etag, last_modified, encoding):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+
+    def _not_modified(self, etag, generated_at):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(generated_at) <= since
+        return False
+
+
+def start_page_server(host, port, store=None):
+    """在后台线程启动页面服务，返回服务实例。"""
+    server = ThreadingHTTPServer((host, port), PageRequestHandler)
+    server.daemon_threads = True
+    server.store = store or get_output_store()
+    threading.Thread(target=server.serve_forever, name="page-server", daemon=True).start()
+    logger.info(f"页面服务已启动: http://{host}:{port}/pages/")
+    return server
@@ -0,0 +1,35 @@
+"""
+答案、模板与题干接口的快速解码。
+
+优先使用 orjson / msgspec 解析 JSON，未安装时回退到标准库 json。
+"""
+import json
+
+try:
+    import orjson
+
+    def loads(raw):
+        return orjson.loads(raw)
+
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+
+        _msgspec_decoder = msgspec.json.Decoder()
+
+        def loads(raw):
+            if isinstance(raw, str):
+                raw = raw.encode("utf-8")
+            try:
+                return _msgspec_decoder.decode(raw)
+            except msgspec.DecodeError as error:
+                # 与 json / orjson 保持一致，解析失败统一抛出 ValueError
+                raise ValueError(str(error)) from error
+
+        JSON_BACKEND = "msgspec"
+    except ImportError:
+        def loads(raw):
+            return json.loads(raw)
+
+        JSON_BACKEND = "json"
@@ -0,0 +1,240 @@
+"""
+生成答案页面的处理流程。
+
+各阶段按依赖关系组成一张小的有向无环图，互不依赖的阶段并发执行：
+    videos ──────────────────────────────┐
+    template ──> answers ──> parents ──> render
+微课视频只依赖模板编号，与 模板→答案 链路并行；题干只依赖答案数据，在渲染前并发预取。
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Optional
+
+from loguru import logger
+
+from src.GetAnswer import events
+from src.GetAnswer.config import PIPELINE_MAX_WORKERS
+from src.GetAnswer.homework_api import get_homework_answers, get_video_urls, resolve_template
+from src.GetAnswer.html_generator import fetch_parent_contents, json_to_html
+from src.GetAnswer.metrics import PIPELINE_STAGE_SECONDS, RENDER_SECONDS
+
+
+class StageGraph:
+    """
+    按依赖关系并发执行的阶段图。
+
+    每个阶段以其依赖阶段的结果作为关键字参数调用，依赖全部完成后立即提交到线程池。
+    工作线程中发布的事件经 EventRelay 转交回调用 run() 的线程，保证 PyWebIO 会话能够渲染。
+    """
+
+    POLL_INTERVAL = 0.05  # 等待阶段完成期间转交事件的间隔（秒）
+
+    def __init__(self, max_workers=PIPELINE_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._stages = {}
+        self.timings = {}  # 阶段名 -> (相对开始时间, 耗时)，单位秒
+
+    def add(self, name, func, after=()):
+        if name in self._stages:
+            raise ValueError(f"阶段已存在: {name}")
+        missing = [dependency for dependency in after if dependency not in self._stages]
+        if missing:
+            raise ValueError(f"阶段 {name} 依赖了未定义的阶段: {missing}")
+        self._stages[name] = (func, tuple(after))
+        return self
+
+    def run(self) -> dict:
+        """执行所有阶段并返回 {阶段名: 结果}；任一阶段抛出异常时等待进行中的阶段结束后重新抛出"""
+        relay = events.EventRelay()
+        results = {}
+        pending = dict(self._stages)
+        running = {}
+        started = time.perf_counter()
+        error = None
+
+        def timed(name, func, kwargs):
+            stage_started = time.perf_counter()
+            try:
+                return relay.run(func, **kwargs)
+            finally:
+                duration = time.perf_counter() - stage_started
+                self.timings[name] = (stage_started - started, duration)
+                PIPELINE_STAGE_SECONDS.observe(duration, stage=name)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline") as executor:
+            while pending or running:
+                if error is None:
+                    for name, (func, after) in list(pending.items()):
+                        if all(dependency in results for dependency in after):
+                            kwargs = {dependency: results[dependency] for dependency in after}
+                            running[executor.submit(timed, name, func, kwargs)] = name
+                            del pending[name]
+                elif not running:
+                    break
+
+                done, _ = wait(running, timeout=self.POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                relay.drain()
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as stage_error:
+                        logger.error(f"阶段 {name} 执行失败: {stage_error}")
+                        error = error or stage_error
+        relay.drain()
+
+        if error is not None:
+            raise error
+        return results
+
+    def format_timings(self) -> str:
+        return ", ".join(
+            f"{name} {offset * 1000:.0f}+{duration * 1000:.0f}ms"
+            for name, (offset, duration) in sorted(self.timings.items(), key=lambda item: item[1][0])
+        )
+
+
+@dataclass
+class TemplatePage:
+    template_code: str
+    template_id: str
+    template_name: str
+    html: str
+    timings: dict = field(default_factory=dict)
+    sources: dict = field(default_factory=dict)  # 生成时的原始数据，保存后供下次增量生成
+
+
+def _question_key(index, item):
+    question = item.get("question") or {}
+    return question.get("questionId") or f"#{index}"
+
+
+def diff_answers(previous_answers, answers):
+    """
+    逐题比较两次获取的答案数据。
+
+    Returns:
+        tuple: (变化的题目数, 题目总数, 变化题目所属的题干ID集合)
+    """
+    previous_items = {
+        _question_key(index, item): item for index, item in enumerate((previous_answers or {}).get("data") or [])
+    }
+    changed, changed_parent_ids = 0, set()
+    items = (answers or {}).get("data") or []
+    for index, item in enumerate(items):
+        if previous_items.get(_question_key(index, item)) != item:
+            changed += 1
+            changed_parent_ids.add((item.get("question") or {}).get("parentId"))
+    return changed, len(items), changed_parent_ids
+
+
+def build_template_page(template_code, account_pool, previous=None, refresh=False) -> Optional[TemplatePage]:
+    """
+    获取模板、答案、微课视频与题干并渲染答案页面，不涉及界面与文件写入。
+
+    refresh 为 True 时跳过响应缓存，保证重新生成时拿到上游的最新数据。
+
+    进度与提示通过事件总线发布。传入上次生成的原始数据（output_store.get_sources）时增量生成：
+    模板信息、微课视频与答案都重新获取，并与上次的数据比较、提示变化；未变化题目的题干与 HTML 片段
+    复用上次结果，只为新增或变化的题目获取题干、渲染片段。
+
+    Returns:
+        TemplatePage or None: 模板数据获取失败时为 None
+    """
+    previous = previous or {}
+    subject = previous.get("subject")
+    fragments = dict(previous.get("fragments") or {})
+
+    def videos():
+        events.publish(events.PROGRESS, '正在获取微课视频信息...', percent=10)
+        with account_pool.use(account_pool.select(subject, template_code)) as manager:
+            video_data = get_video_urls(template_code, manager, refresh=refresh)
+        if video_data:
+            logger.info(f"存在微课视频数据")
+            events.publish(events.TOAST, "已获取到微课视频信息", color='info')
+        if "videos" in previous and video_data != previous["videos"]:
+            events.publish(events.INFO, "微课视频有变化")
+        return video_data
+
+    def template():
+        events.publish(events.PROGRESS, '正在获取模板基本信息...', percent=15)
+        account, response_data = resolve_template(account_pool, template_code, refresh)
+        if not response_data:
+            return None
+        template_id = response_data["data"]["templateId"]
+        template_name = response_data["data"]["templateName"].replace('　', ' ')
+        if previous.get("template_id"):
+            events.publish(events.TOAST, f"开始增量更新：{template_name}", color='info')
+            if (template_id, template_name) != (previous["template_id"], previous.get("template_name")):
+                events.publish(events.INFO, f"模板信息有变化：{previous.get('template_name')} -> {template_name}")
+        else:
+            events.publish(events.TOAST, f"开始处理：{template_name}", color='info')
+        return account, template_id, template_name
+
+    def answers(template):
+        if template is None:
+            return None
+        events.publish(events.PROGRESS, '正在获取作业答案数据...', percent=35)
+        account, template_id, _ = template
+        with account_pool.use(account) as manager:
+            answer_data = get_homework_answers(template_id, manager=manager, refresh=refresh)
+        # 该账号已确认能解析此模板，获取答案失败才算作账号故障
+        if answer_data is None:
+            account_pool.report_failure(account)
+        return answer_data
+
+    def parents(template, answers):
+        if not answers or not answers.get("data"):
+            return {}
+        known = None
+        if previous.get("answers"):
+            changed, total, changed_parent_ids = diff_answers(previous["answers"], answers)
+            # 获取出错的题干与变化题目所属的题干重新获取，其余复用
+            known = {
+                parent_id: content for parent_id, content in (previous.get("parents") or {}).items()
+                if content is not None and parent_id not in changed_parent_ids
+            }
+            events.publish(events.INFO, f"共 {total} 题，其中 {changed} 题有变化")
+        events.publish(events.PROGRESS, '正在获取题干内容...', percent=55)
+        with account_pool.use(template[0]) as manager:
+            return fetch_parent_contents(answers, manager, known=known, refresh=refresh)
+
+    def render(template, answers, videos, parents):
+        if template is None:
+            return None
+        events.publish(events.PROGRESS, '正在生成HTML内容...', percent=75)
+        account, _, template_name = template
+        with RENDER_SECONDS.time():
+            return json_to_html(answers, template_name, videos, account.manager, parents, fragments)
+
+    graph = (
+        StageGraph()
+        .add("videos", videos)
+        .add("template", template)
+        .add("answers", answers, after=("template",))
+        .add("parents", parents, after=("template", "answers"))
+        .add("render", render, after=("template", "answers", "videos", "parents"))
+    )
+    results = graph.run()
+    logger.info(f"模板 {template_code} 各阶段耗时: {graph.format_timings()}")
+
+    if results["template"] is None:
+        return None
+    _, template_id, template_name = results["template"]
+    # 答案获取失败时不保存，避免下次增量生成以空数据为基准
+    sources = {
+        "template_id": template_id,
+        "template_name": template_name,
+        "subject": account_pool.template_subject(template_code) or subject,
+        "videos": results["videos"],
+        "answers": results["answers"],
+        "parents": results["parents"],
+        "fragments": fragments,
+    } if results["answers"] else {}
+    return TemplatePage(template_code, template_id, template_name, results["render"], dict(graph.timings), sources)
+
+
+def normalize_template_code(text):
+    """去掉最后的&及其后面的部分（适用于自助题卡 获取答案时不需要此参数）"""
+    return text.strip().split('&')[0]
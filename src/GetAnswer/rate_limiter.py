@@ -0,0 +1,104 @@
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from src.GetAnswer.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_ENDPOINT_RULES,
+    RATE_LIMIT_GLOBAL,
+    RATE_LIMIT_PER_ACCOUNT,
+)
+from src.GetAnswer.metrics import RATE_LIMIT_WAIT, endpoint_label
+
+
+class TokenBucket:
+    """
+    令牌桶。reserve() 立即预占一个令牌并返回需要等待的时间，令牌数允许为负，
+    从而让排队的请求按到达顺序依次获得放行时间。
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """进程级上游限流：全局、按接口、按账号三层令牌桶，请求需同时满足所有层级。"""
+
+    def __init__(self, enabled=RATE_LIMIT_ENABLED, global_limit=RATE_LIMIT_GLOBAL,
+                 account_limit=RATE_LIMIT_PER_ACCOUNT, endpoint_rules=RATE_LIMIT_ENDPOINT_RULES):
+        self.enabled = enabled
+        self.account_limit = account_limit
+        self._global = TokenBucket(*global_limit) if global_limit else None
+        self._endpoint_rules = [(re.compile(pattern), rate, capacity) for pattern, rate, capacity in endpoint_rules]
+        self._endpoint_buckets = {}
+        self._account_buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "delayed": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def acquire(self, url, account=None):
+        """
+        阻塞直到允许发送请求。
+
+        account 为稳定的账号标识（AccountManager.account_id），重新登录换 Token 后仍使用同一个令牌桶；
+        为 None 时只受全局与接口限流。
+
+        返回:
+        - float: 实际排队等待的秒数。
+        """
+        if not self.enabled:
+            return 0.0
+        wait = 0.0
+        for bucket in self._buckets_for(url, account):
+            wait = max(wait, bucket.reserve())
+        if wait > 0:
+            time.sleep(wait)
+        RATE_LIMIT_WAIT.observe(wait, endpoint=endpoint_label(url))
+        with self._lock:
+            self._stats["requests"] += 1
+            if wait > 0:
+                self._stats["delayed"] += 1
+                self._stats["total_wait"] += wait
+                self._stats["max_wait"] = max(self._stats["max_wait"], wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["average_wait"] = stats["total_wait"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def _buckets_for(self, url, account):
+        buckets = [self._global] if self._global else []
+        path = urlsplit(url).path
+        with self._lock:
+            for index, (pattern, rate, capacity) in enumerate(self._endpoint_rules):
+                if pattern.search(path):
+                    bucket = self._endpoint_buckets.get(index)
+                    if bucket is None:
+                        bucket = self._endpoint_buckets[index] = TokenBucket(rate, capacity)
+                    buckets.append(bucket)
+                    break
+            if account and self.account_limit:
+                bucket = self._account_buckets.get(account)
+                if bucket is None:
+                    bucket = self._account_buckets[account] = TokenBucket(*self.account_limit)
+                buckets.append(bucket)
+        return buckets
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,144 @@
+import glob
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from loguru import logger
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from src.GetAnswer.config import REPLAY_LATENCY, REPLAY_SEED
+from src.GetAnswer.response_cache import normalize_url
+
+# 回放的响应体已解压且长度可能变化，这些头部不再适用
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def iter_debug_records(records_path):
+    """
+    按时间顺序读取调试记录，包含同目录下已轮转（可能已压缩）的分段文件。
+    """
+    base, ext = os.path.splitext(records_path)
+    segments = sorted(glob.glob(f"{glob.escape(base)}-*{ext}") + glob.glob(f"{glob.escape(base)}-*{ext}.gz"))
+    if os.path.exists(records_path):
+        segments.append(records_path)
+
+    for segment in segments:
+        opener = gzip.open if segment.endswith(".gz") else open
+        with opener(segment, "rt", encoding="utf-8") as file:
+            for line_number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"跳过无法解析的调试记录: {segment}:{line_number}")
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    用调试记录代替网络的 requests 传输适配器。
+
+    按 方法 + 路径 + 查询参数（去除签名等易变参数）建立索引，同一请求有多条记录时按记录顺序轮流返回。
+    未命中记录时返回 404，响应头带 X-Replay: miss。
+
+    只有完整记录的响应才能回放：录制时需使用 DEBUG_RECORD_LEVEL = "full"、不设置采样
+    （DEBUG_RECORD_SAMPLE_RATES 为空），并把 DEBUG_RECORD_MAX_BODY_BYTES 调到大于最大的答案响应。
+    被截断或只有元数据的记录在加载时跳过，对应请求回放时按未命中处理。
+    """
+
+    def __init__(self, records_path, latency=REPLAY_LATENCY, seed=REPLAY_SEED):
+        super().__init__()
+        self.latency = latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._index = defaultdict(list)
+        self._cursors = defaultdict(int)
+        self._stats = {"hits": 0, "misses": 0}
+        self._load(records_path)
+
+    def _load(self, records_path):
+        count = 0
+        incomplete = 0
+        for record in iter_debug_records(records_path):
+            # 没有状态码的是网络异常记录，无法回放
+            if record.get("status_code") is None or not record.get("url"):
+                continue
+            # 截断的响应体不是有效 JSON，只有元数据的记录没有响应体，回放出来只会得到错误数据
+            if record.get("response_truncated") or (
+                    record.get("response_json") is None and record.get("response_text") is None
+                    and record.get("response_size")):
+                incomplete += 1
+                continue
+            key = normalize_url(record["url"], record.get("method", "GET"))
+            self._index[key].append(record)
+            count += 1
+        logger.info(f"回放索引加载完成: {count} 条记录, {len(self._index)} 个请求")
+        if incomplete:
+            logger.warning(f"跳过 {incomplete} 条响应体被截断或未保存的记录，对应请求回放时将未命中；"
+                           f"录制时请使用 full 级别、关闭采样并调大 DEBUG_RECORD_MAX_BODY_BYTES")
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = normalize_url(request.url, request.method)
+        with self._lock:
+            records = self._index.get(key)
+            if records:
+                record = records[self._cursors[key] % len(records)]
+                self._cursors[key] += 1
+                self._stats["hits"] += 1
+            else:
+                record = None
+                self._stats["misses"] += 1
+            delay_ms = self._latency_for(record)
+
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+        if record is None:
+            logger.warning(f"回放未命中: {key}")
+            return self._build_response(request, 404, {"X-Replay": "miss"},
+                                        json.dumps({"code": 404, "msg": "回放记录中没有该请求"}, ensure_ascii=False))
+        return self._build_response(request, record["status_code"], record.get("response_headers") or {},
+                                    self._record_body(record))
+
+    def close(self):
+        pass
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, requests=len(self._index))
+
+    def _latency_for(self, record):
+        if self.latency == "recorded":
+            return (record or {}).get("elapsed_ms") or 0
+        if isinstance(self.latency, (int, float)):
+            return self.latency
+        if isinstance(self.latency, (tuple, list)):
+            return self._random.uniform(*self.latency)
+        return 0
+
+    @staticmethod
+    def _record_body(record):
+        if record.get("response_json") is not None:
+            return json.dumps(record["response_json"], ensure_ascii=False)
+        return record.get("response_text") or ""
+
+    def _build_response(self, request, status_code, headers, body):
+        response = Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict({
+            key: value for key, value in headers.items() if key.lower() not in _DROPPED_HEADERS
+        })
+        response.headers.setdefault("X-Replay", "hit")
+        response._content = body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
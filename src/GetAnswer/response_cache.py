@@ -0,0 +1,187 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from loguru import logger
+
+from src.GetAnswer.config import (
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SQLITE_PATH,
+    RESPONSE_CACHE_TTL_RULES,
+)
+from src.GetAnswer.payloads import loads
+
+# 每次请求都会变化的参数，不参与缓存键计算
+VOLATILE_PARAMS = {"t", "encrypt", "clientsession", "clientsessionid"}
+
+
+def normalize_url(url, method="GET"):
+    """将 URL 规范化为缓存键：方法 + 路径 + 排序后的查询参数（去除易变参数）。"""
+    parsed_url = urlsplit(url)
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed_url.query, keep_blank_values=True)
+        if key.lower() not in VOLATILE_PARAMS
+    )
+    normalized = f"{method.upper()} {parsed_url.path}"
+    if query:
+        normalized += "?" + urlencode(query)
+    return normalized
+
+
+class ResponseCache:
+    """
+    带 TTL 的响应缓存：内存 LRU 层 + 可选的 SQLite 磁盘层。
+
+    缓存的是响应原文，命中时重新解析，避免调用方修改共享对象。
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_rules=RESPONSE_CACHE_TTL_RULES,
+                 sqlite_path=RESPONSE_CACHE_SQLITE_PATH):
+        self.max_entries = max_entries
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in ttl_rules]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+            "bytes_saved": 0,
+        }
+        if sqlite_path:
+            self._open_db(sqlite_path)
+
+    def _open_db(self, sqlite_path):
+        try:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, body TEXT NOT NULL)"
+            )
+            self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+        except sqlite3.Error as error:
+            logger.error(f"打开响应缓存数据库失败: {error}")
+            self._db = None
+
+    def ttl_for(self, url):
+        """返回 URL 对应的缓存时间，0 表示不缓存。"""
+        path = urlsplit(url).path
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(path):
+                return ttl
+        return 0
+
+    def get(self, url):
+        """
+        查询缓存。
+
+        返回:
+        - dict: 命中时重新解析的 JSON 数据。
+        - None: 未命中、已过期或该接口不缓存。
+        """
+        if not self.ttl_for(url):
+            return None
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, body = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._record_hit("memory_hits", body)
+                    return loads(body)
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+            body = self._get_from_db(key, now)
+            if body is not None:
+                self._record_hit("disk_hits", body)
+                return loads(body)
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, url, body):
+        """写入缓存，body 为响应原文。不可缓存的接口直接忽略。"""
+        ttl = self.ttl_for(url)
+        if not ttl:
+            return
+        key = normalize_url(url)
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._put_memory(key, expires_at, body)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO response_cache (key, expires_at, body) VALUES (?, ?, ?)",
+                        (key, expires_at, body)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as error:
+                    logger.error(f"写入响应缓存数据库失败: {error}")
+
+    def invalidate(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _record_hit(self, tier, body):
+        self._stats["hits"] += 1
+        self._stats[tier] += 1
+        self._stats["bytes_saved"] += len(body.encode("utf-8"))
+
+    def _put_memory(self, key, expires_at, body):
+        self._entries[key] = (expires_at, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _get_from_db(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT expires_at, body FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as error:
+            logger.error(f"读取响应缓存数据库失败: {error}")
+            return None
+        if row is None:
+            return None
+        expires_at, body = row
+        if expires_at <= now:
+            self._stats["expired"] += 1
+            return None
+        # 提升到内存层
+        self._put_memory(key, expires_at, body)
+        return body
+
+
+response_cache = ResponseCache()
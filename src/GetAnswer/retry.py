@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from loguru import logger
+
+from src.GetAnswer.config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RECOVERY_TIMEOUT,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+    RETRY_STATUS_CODES,
+)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """接口处于熔断状态时直接抛出，调用方按网络异常处理。"""
+
+
+class RetryPolicy:
+    """
+    指数退避 + 全抖动的重试策略，支持 Retry-After。
+
+    非幂等请求默认不重试，调用方确认可安全重放时可传 idempotent=True。
+    """
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+                 retry_status_codes=RETRY_STATUS_CODES):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_status_codes = set(retry_status_codes)
+
+    @staticmethod
+    def is_idempotent(method, idempotent=None):
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in IDEMPOTENT_METHODS
+
+    def should_retry(self, attempt, method, idempotent=None, response=None, error=None):
+        if attempt >= self.max_attempts or not self.is_idempotent(method, idempotent):
+            return False
+        if isinstance(error, CircuitOpenError):
+            return False
+        if error is not None:
+            return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        return response is not None and response.status_code in self.retry_status_codes
+
+    def delay_for(self, attempt, response=None):
+        """第 attempt 次失败后的等待时间：优先使用 Retry-After，否则为带全抖动的指数退避。"""
+        retry_after = self._parse_retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def _parse_retry_after(response):
+        if response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """
+    单个接口的熔断器：连续失败达到阈值后打开，冷却结束进入半开并只放行一个探测请求，
+    探测成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, recovery_timeout=BREAKER_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._rejected = 0
+
+    def before_call(self):
+        """请求前调用，熔断中则抛出 CircuitOpenError。"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self._rejected += 1
+        raise CircuitOpenError(f"接口 {self.name} 已熔断，暂停请求")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"接口 {self.name} 熔断恢复")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"接口 {self.name} 连续失败 {self._failures} 次，进入熔断")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "rejected": self._rejected,
+                "open_for": round(time.monotonic() - self._opened_at, 1) if self._state == self.OPEN else 0.0,
+            }
+
+
+default_retry_policy = RetryPolicy()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    """获取（必要时创建）某个接口的熔断器。"""
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+    return breaker
+
+
+def get_breaker_states():
+    """返回所有接口的熔断状态，供监控查询。"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {endpoint: breaker.snapshot() for endpoint, breaker in breakers.items()}
@@ -0,0 +1,264 @@
+"""
+新教育接口的本地桩服务，用于在单机上对完整流程进行压测。
+
+用法:
+    python -m src.GetAnswer.stub_server --port 9000 --questions 60 --parents 8 --latency lognormal:80,0.5
+    XINJIAOYU_BASE_URL=http://127.0.0.1:9000 python src/GetAnswer/main.py
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+
+from src.GetAnswer.AccountManager import AccountManager
+from src.GetAnswer.XinjiaoyuEncryptioner import XinjiaoyuEncryptioner
+
+_JWT_SECRET = b"xinjiaoyu-stub"
+_QUESTION_PATH = re.compile(r"^/api/v3/server_questions/questions/([^/]+)$")
+
+
+@dataclass
+class StubConfig:
+    questions: int = 40  # 每份答案的题目数
+    parents: int = 5  # 带题干的大题数量，题目平均分配到各题干下
+    options: int = 4  # 选择题的选项数
+    content_bytes: int = 400  # 每道题题目/解析的大致字节数
+    videos: int = 3  # 微课视频数量
+    latency: str = "fixed:0"  # 延迟分布: fixed:毫秒 / uniform:最小,最大 / lognormal:中位数,sigma
+    error_rate: float = 0.0  # 返回 HTTP 500 的概率
+    token_ttl: int = 7 * 86400  # 签发 token 的有效期（秒）
+    expire_every: int = 0  # 每 N 个需要登录的请求强制返回一次登录失效，0 表示不强制
+    expiry_code: int = 410  # 强制登录失效时返回的业务码（410 或 416）
+    seed: int = 0
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _issue_token(username, ttl):
+    header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64url(json.dumps({"sub": username, "exp": int(time.time()) + ttl}).encode())
+    signature = hmac.new(_JWT_SECRET, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64url(signature)}"
+
+
+def _token_exp(token):
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("exp", 0)
+    except (IndexError, ValueError):
+        return 0
+
+
+class StubState:
+    """桩服务的共享状态：请求计数、延迟采样与确定性的数据生成。"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.authorized_count = 0
+        self.safe_code = XinjiaoyuEncryptioner.encrypt("jbyxinjiaoyu", AccountManager.ENCRYPTION_KEY)
+
+    def sample_latency(self):
+        kind, _, args = self.config.latency.partition(":")
+        values = [float(value) for value in args.split(",") if value]
+        with self._lock:
+            if kind == "uniform":
+                return self._random.uniform(values[0], values[1])
+            if kind == "lognormal":
+                return self._random.lognormvariate(math.log(values[0]), values[1])
+        return values[0] if values else 0
+
+    def should_fail(self):
+        with self._lock:
+            self.request_count += 1
+            return self._random.random() < self.config.error_rate
+
+    def should_expire(self):
+        with self._lock:
+            self.authorized_count += 1
+            return bool(self.config.expire_every) and self.authorized_count % self.config.expire_every == 0
+
+    def _filler(self, seed_text, size):
+        digest = hashlib.sha256(seed_text.encode()).hexdigest()
+        return (digest * (size // len(digest) + 1))[:size]
+
+    def template(self, template_code):
+        return {
+            "templateId": f"T{hashlib.md5(template_code.encode()).hexdigest()[:16]}",
+            "templateName": f"桩服务作业　{template_code}",
+            "templateCode": template_code,
+        }
+
+    def answers(self, template_id):
+        config = self.config
+        items = []
+        per_parent = max(config.questions // config.parents, 1) if config.parents else 0
+        for index in range(config.questions):
+            parent_index = index // per_parent if per_parent else None
+            parent_id = f"{template_id}-P{parent_index}" if per_parent and parent_index < config.parents else "0"
+            is_choice = config.options and index % 2 == 0
+            question = {
+                "questionId": f"{template_id}-Q{index}",
+                "parentId": parent_id,
+                "questionNumber": str(index + 1),
+                "typeName": "单选题" if is_choice else "填空题",
+                "typeDetailName": "单选题" if is_choice else "填空题",
+                "difficultyName": "中等",
+                "content": f"<p>第{index + 1}题 {self._filler(f'{template_id}c{index}', config.content_bytes)}</p>",
+                "answerExplanation": f"<p>{self._filler(f'{template_id}e{index}', config.content_bytes)}</p>",
+                "answer": "A" if is_choice else f"答案{index + 1}",
+            }
+            if is_choice:
+                question["options"] = [
+                    {"option": chr(ord("A") + option_index), "optionContent": f"选项{option_index + 1}"}
+                    for option_index in range(config.options)
+                ]
+            items.append({"question": question})
+        return items
+
+    def parent(self, parent_id):
+        return {"id": parent_id, "content": f"<p>题干 {parent_id} {self._filler(parent_id, self.config.content_bytes)}</p>"}
+
+    def videos(self, template_code):
+        return [
+            {"pointName": f"知识点{index + 1}", "videoUrl": f"https://example.invalid/{template_code}/{index}.mp4"}
+            for index in range(self.config.videos)
+        ]
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server_version = "XinjiaoyuStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        logger.debug(f"[桩服务] {self.address_string()} {format % args}")
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method):
+        delay_ms = self.state.sample_latency()
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+        body = b""
+        if method == "POST":
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.state.should_fail():
+            self._send_json({"code": 500, "msg": "桩服务模拟错误"}, status=500)
+            return
+
+        parsed_url = urlsplit(self.path)
+        path = parsed_url.path
+        query = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+
+        if path == "/api/v3/server_system/system/code":
+            self._send_ok(self.state.safe_code)
+        elif path == "/api/v3/server_system/auth/login" and method == "POST":
+            self._login(body)
+        elif not self._authorized():
+            return
+        elif path == "/api/v3/server_system/member/user/vip":
+            self._send_ok({"vip": False})
+        elif path.endswith("/homework/template/question/list"):
+            self._send_ok(self.state.template(query.get("templateCode", "")))
+        elif path.endswith("/homework/answer/sheet/student/questions/answer"):
+            self._send_ok(self.state.answers(query.get("templateId", "")))
+        elif path.endswith("/homework/point/videos/list"):
+            self._send_ok(self.state.videos(query.get("templateCode", "")))
+        elif _QUESTION_PATH.match(path):
+            self._send_ok(self.state.parent(_QUESTION_PATH.match(path).group(1)))
+        else:
+            self._send_json({"code": 404, "msg": f"桩服务未实现: {path}"}, status=404)
+
+    def _login(self, body):
+        try:
+            login_data = json.loads(body or b"{}")
+            username = XinjiaoyuEncryptioner.decrypt(login_data["username"], AccountManager.ENCRYPTION_KEY)
+        except (KeyError, ValueError):
+            self._send_json({"code": 400, "msg": "登录参数错误"})
+            return
+        self._send_ok({
+            "token": _issue_token(username, self.state.config.token_ttl),
+            "accessToken": hashlib.md5(f"{username}{time.time()}".encode()).hexdigest(),
+            "info": {"realName": username, "school": {"studentId": f"S{int(hashlib.md5(username.encode()).hexdigest()[:8], 16)}"}},
+        })
+
+    def _authorized(self):
+        authorization = self.headers.get("authorization", "")
+        token = authorization[4:] if authorization.startswith("JBY ") else ""
+        if not token or _token_exp(token) <= time.time() or self.state.should_expire():
+            self._send_json({"code": self.state.config.expiry_code, "msg": "请重新登录"})
+            return False
+        return True
+
+    def _send_ok(self, data):
+        self._send_json({"code": 200, "msg": "success", "data": data})
+
+    def _send_json(self, payload, status=200):
+        content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def create_stub_server(host="127.0.0.1", port=9000, config: StubConfig = None) -> ThreadingHTTPServer:
+    """创建桩服务（未启动），调用方负责 serve_forever / shutdown。"""
+    server = ThreadingHTTPServer((host, port), StubRequestHandler)
+    server.daemon_threads = True
+    server.state = StubState(config or StubConfig())
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="新教育接口本地桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    defaults = StubConfig()
+    for field_name, value in vars(defaults).items():
+        parser.add_argument(f"--{field_name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    config = StubConfig(**{field_name: getattr(args, field_name) for field_name in vars(defaults)})
+    server = create_stub_server(args.host, args.port, config)
+    logger.info(f"桩服务已启动: http://{args.host}:{args.port} ({config})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from loguru import logger
+
+from src.GetAnswer.config import (
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_REFRESH_MAX_SLEEP,
+    TOKEN_REFRESH_RETRY_INTERVAL,
+)
+from src.GetAnswer.metrics import TOKEN_REFRESHES
+
+
+class TokenRefreshScheduler:
+    """
+    后台线程根据 JWT 的 exp 在过期前主动重新登录，刷新 Token 与 SafeCode，
+    使正常情况下用户请求不会因为登录失效而等待一次完整的登录往返。
+    """
+
+    def __init__(self, account_manager, margin=TOKEN_REFRESH_MARGIN, retry_interval=TOKEN_REFRESH_RETRY_INTERVAL,
+                 max_sleep=TOKEN_REFRESH_MAX_SLEEP):
+        self.account_manager = account_manager
+        self.margin = margin
+        self.retry_interval = retry_interval
+        self.max_sleep = max_sleep
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+        self._thread.start()
+        logger.info(f"Token 主动刷新已启动，提前 {self.margin} 秒刷新")
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def seconds_until_refresh(self):
+        """距离下一次刷新的秒数；Token 缺失或无法解析时返回 0，立即刷新。"""
+        token = self.account_manager.public_user_data.get("token")
+        expiry = self.account_manager.get_token_expiry(token)
+        if expiry is None:
+            return 0
+        return max(expiry - self.margin - time.time(), 0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.seconds_until_refresh()
+            if wait > 0:
+                self._stop.wait(min(wait, self.max_sleep))
+                continue
+
+            logger.info("Token 即将过期，开始主动刷新登录")
+            try:
+                success = self.account_manager.relogin(force=True)
+            except Exception as e:
+                logger.error(f"主动刷新登录时发生错误: {e}")
+                success = False
+            TOKEN_REFRESHES.inc(result="success" if success else "failure")
+            if success:
+                logger.info("Token 主动刷新成功")
+                # 刷新后仍处于刷新窗口内（如上游签发的有效期短于提前量），按重试间隔等待，避免连续登录
+                if self.seconds_until_refresh() <= 0:
+                    self._stop.wait(self.retry_interval)
+            else:
+                logger.warning(f"Token 主动刷新失败，{self.retry_interval} 秒后重试")
+                self._stop.wait(self.retry_interval)
@@ -0,0 +1,90 @@
+"""
+账号有效性缓存：统计登录失效前后重新登录过程中对 /member/user/vip 的上游请求次数。
+"""
+import time
+
+import jwt
+import pytest
+
+from src.GetAnswer.AccountManager import AccountManager
+
+
+def _token(name):
+    return jwt.encode({"sub": name, "exp": int(time.time()) + 3600}, "test-secret-key-for-hs256-signing", algorithm="HS256")
+
+
+class FakeUpstream:
+    """只认当前有效 Token 的上游，记录有效性检查与登录次数"""
+
+    def __init__(self, token):
+        self.valid_token = token
+        self.validity_requests = 0
+        self.logins = 0
+
+    def account_valid(self, manager):
+        self.validity_requests += 1
+        return manager.public_user_data.get("token") == self.valid_token
+
+    def login(self):
+        self.logins += 1
+        self.valid_token = _token(f"login-{self.logins}")
+        return {"code": 200, "data": {"token": self.valid_token, "accessToken": "access", "info": {}}}
+
+
+@pytest.fixture
+def account(tmp_path, monkeypatch):
+    token = _token("initial")
+    upstream = FakeUpstream(token)
+    manager = AccountManager(str(tmp_path / "user_data.json"))
+    manager.store.update({"username": "user", "password": "password"})
+    manager.public_user_data = {"token": token, "accessToken": "access"}
+    monkeypatch.setattr(manager, "_request_account_valid", lambda: upstream.account_valid(manager))
+    monkeypatch.setattr(manager, "_encrypt_data", lambda data: data)
+    monkeypatch.setattr(manager, "_prepare_login_request", lambda username, password: ({}, {}))
+    monkeypatch.setattr(manager, "_make_request", lambda url, headers, json_data: upstream.login())
+    return manager, upstream
+
+
+def test_relogin_after_timeout_reads_cached_validity(account):
+    manager, upstream = account
+    assert manager.check_current_account_valid()
+    assert upstream.validity_requests == 1
+
+    # 超时等非登录失效错误后的重新登录直接命中缓存，既不检查也不登录
+    assert manager.relogin()
+    assert upstream.validity_requests == 1
+    assert upstream.logins == 0
+
+
+def test_validity_requests_across_expiry_and_relogin(account):
+    manager, upstream = account
+    assert manager.check_current_account_valid()
+    assert upstream.validity_requests == 1
+
+    # 上游让 Token 失效，请求收到登录失效响应后作废缓存并重新登录
+    expired_token = manager.public_user_data["token"]
+    upstream.valid_token = None
+    manager.invalidate_validity(expired_token)
+    assert manager.relogin()
+    assert upstream.validity_requests == 2
+    assert upstream.logins == 1
+    assert manager.public_user_data["token"] == upstream.valid_token
+
+    # 并发请求中较晚返回的旧 Token 失效响应不影响新 Token 的缓存
+    manager.invalidate_validity(expired_token)
+    assert manager.check_current_account_valid()
+    assert upstream.validity_requests == 2
+    assert upstream.logins == 1
+
+
+def test_successful_response_refreshes_cached_validity(account):
+    manager, upstream = account
+    assert manager.check_current_account_valid()
+
+    # 缓存已过期，但期间有正常响应重新记录了有效，超时后的重新登录仍然命中缓存
+    token, valid, checked_at = manager._validity
+    manager._validity = (token, valid, checked_at - 3600)
+    manager.mark_valid()
+    assert manager.relogin()
+    assert upstream.validity_requests == 1
+    assert upstream.logins == 0
@@ -0,0 +1,85 @@
+"""
+后台任务队列：同一模板的请求合并，以及执行中的普通任务遇到重新生成请求时的处理。
+"""
+import threading
+
+import pytest
+
+from src.GetAnswer import jobs
+from src.GetAnswer.jobs import Job, JobQueue
+from src.GetAnswer.pipeline import TemplatePage
+
+
+class MemoryStore:
+    def __init__(self):
+        self.sources = {}
+
+    def get_sources(self, template_code):
+        return self.sources.get(template_code)
+
+    def put(self, page):
+        self.sources[page.template_code] = page.sources
+        return page.template_code
+
+
+class FakeBuilder:
+    """记录每次生成的参数，第一次生成阻塞到测试放行"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, template_code, account_pool, previous=None, refresh=False):
+        self.calls.append({"previous": previous, "refresh": refresh})
+        if len(self.calls) == 1:
+            self.started.set()
+            assert self.release.wait(5)
+        build = len(self.calls)
+        return TemplatePage(template_code, "id", "name", f"<p>{build}</p>", sources={"build": build})
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    builder = FakeBuilder()
+    monkeypatch.setattr(jobs, "build_template_page", builder)
+    return builder
+
+
+def test_submissions_for_same_template_share_queued_job(builder):
+    queue = JobQueue(account_pool=None, workers=1, store=MemoryStore())
+    first = queue.submit("code")
+    assert queue.submit("code") is first
+    assert queue.submit("code", incremental=True) is first
+    assert first.incremental
+
+    builder.release.set()
+    queue.start()
+    assert first.wait(5)
+    assert first.status == Job.DONE
+    assert builder.calls == [{"previous": None, "refresh": True}]
+
+
+def test_regenerate_while_running_queues_refresh_followup(builder):
+    store = MemoryStore()
+    queue = JobQueue(account_pool=None, workers=1, store=store).start()
+    running = queue.submit("code")
+    assert builder.started.wait(5)
+    assert running.status == Job.RUNNING
+
+    # 执行中的普通任务使用缓存数据，重新生成请求不能并入它
+    followup = queue.submit("code", incremental=True)
+    assert followup is not running
+    assert followup.incremental
+    assert queue.submit("code", incremental=True) is followup
+    assert queue.submit("code") is running
+
+    builder.release.set()
+    assert running.wait(5) and followup.wait(5)
+    assert running.status == Job.DONE and followup.status == Job.DONE
+    assert builder.calls[0] == {"previous": None, "refresh": False}
+    # 追加的任务在普通任务保存之后执行，基于其结果重新获取上游数据
+    assert builder.calls[1] == {"previous": {"build": 1}, "refresh": True}
+    assert len(builder.calls) == 2
+    assert store.sources["code"] == {"build": 2}
+    assert queue.stats()["queued"] == 0